@@ -5,9 +5,9 @@ if __name__ == '__main__' and __package__ is None:
 
 import os
 import sys
-import datetime
 
 from openmovement.load import MultiData
+from openmovement.load.csv_load import _csv_datetime_strings
 
 def run_sensors(source_file):
     ext = '.sensors.csv'
@@ -19,20 +19,21 @@ def run_sensors(source_file):
     #print(samples)
     output_lines = 0
 
+    # Time strings formatted for all of the samples at once
+    time_strings = _csv_datetime_strings(samples[:,0], milliseconds=True).astype(str)
+
     output_file = os.path.splitext(source_file)[0] + ext
     with open(output_file, 'w') as writer:
         if include_gyro:
             writer.write("Time,AccelX,AccelY,AccelZ,GyroX,GyroY,GyroZ,Light,Temp\n")
-            for time, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z, light, temp in samples:
-                time_string = datetime.datetime.fromtimestamp(time, tz=datetime.timezone.utc).isoformat(sep=' ', timespec='milliseconds')[0:23]
+            for time_string, (accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z, light, temp) in zip(time_strings, samples[:,1:]):
                 line = time_string + "," + str(accel_x) + "," + str(accel_y) + "," + str(accel_z) + "," + str(gyro_x) + "," + str(gyro_y) + "," + str(gyro_z) + "," + str(light) + "," + str(temp)
                 writer.write(line + "\n")
                 #print(line)
                 output_lines += 1
         else:
             writer.write("Time,AccelX,AccelY,AccelZ,Light,Temp\n")
-            for time, accel_x, accel_y, accel_z, light, temp in samples:
-                time_string = datetime.datetime.fromtimestamp(time, tz=datetime.timezone.utc).isoformat(sep=' ', timespec='milliseconds')[0:23]
+            for time_string, (accel_x, accel_y, accel_z, light, temp) in zip(time_strings, samples[:,1:]):
                 line = time_string + "," + str(accel_x) + "," + str(accel_y) + "," + str(accel_z) + "," + str(light) + "," + str(temp)
                 writer.write(line + "\n")
                 #print(line)
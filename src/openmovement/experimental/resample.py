@@ -1,7 +1,9 @@
 import math
+from functools import lru_cache
 import numpy as np
 #import pandas as pd
 import scipy
+import scipy.signal
 
 # --- HACK: Allow this to run standalone as specified by a file in the repo (rather than only through the module)
 if __name__ == '__main__' and __package__ is None:
@@ -10,7 +12,160 @@ if __name__ == '__main__' and __package__ is None:
 
 from openmovement.process.filter import filter
 
-def resample_fixed(sample_values, use_time=None, in_frequency=None, out_frequency=None, lp_filter=True, interpolation_mode='linear'):
+# Minimum data size (bytes) to resample on a GPU, when available, with backend='auto' (smaller data is not worth the transfers)
+_GPU_MIN_BYTES = 64 * 1024 * 1024
+
+@lru_cache(maxsize=None)
+def _cupy():
+    """
+    The optional CuPy module and its scipy.signal equivalent as (cupy, cupyx.scipy.signal), or None if not installed or no GPU is available.
+    """
+    try:
+        import cupy
+        import cupyx.scipy.signal
+        if cupy.cuda.runtime.getDeviceCount() <= 0:
+            return None
+        return (cupy, cupyx.scipy.signal)
+    except Exception:
+        return None
+
+
+def _infer_fs(values):
+    """
+    The sample frequency recorded in the metadata of the values' dtype, or in their attrs, or None.
+    """
+    metadata = getattr(getattr(values, 'dtype', None), 'metadata', None)
+    if metadata and 'fs' in metadata:
+        return metadata['fs']
+    attrs = getattr(values, 'attrs', None)
+    if attrs and 'fs' in attrs:
+        return attrs['fs']
+    return None
+
+
+def _interpolate_axes(x, y, x_new, kind):
+    """
+    Linear or nearest interpolation of all of the axes at once, equivalent to `scipy.interpolate.interp1d(x, y, kind=kind, axis=0, bounds_error=False, fill_value='extrapolate')(x_new)`.
+    The position of each new sample is found once and shared by every axis, and there is no interpolator object to construct.
+
+    :param x: ascending sample positions
+    :param y: sample values, (samples,) or (samples, axes)
+    :param x_new: positions to interpolate at (outside the range of `x`, linear extrapolates, nearest uses the end sample)
+    :param kind: 'linear' or 'nearest'
+    """
+    if kind == 'nearest':
+        # Nearest sample, with ties going to the earlier sample
+        half = x / 2.0
+        index = np.searchsorted(half[1:] + half[:-1], x_new, side='left')
+        return y[index]
+    # Linear: a single axis within range is one call (np.interp holds the end values rather than extrapolating)
+    if y.ndim == 1 and (len(x_new) == 0 or (x_new.min() >= x[0] and x_new.max() <= x[-1])):
+        return np.interp(x_new, x, y)
+    # Linear: the bracketing pair of samples for each new position
+    hi = np.clip(np.searchsorted(x, x_new), 1, len(x) - 1)
+    lo = hi - 1
+    y_lo = y[lo]
+    fraction = (x_new - x[lo]) / (x[hi] - x[lo])
+    if y.dtype == np.float32:
+        # Keep reduced-precision input at that precision
+        fraction = fraction.astype(np.float32)
+    if y.ndim > 1:
+        fraction = fraction[:, None]
+    return fraction * (y[hi] - y_lo) + y_lo
+
+class ResamplePlan:
+    """
+    The parts of a fixed-rate resampling that depend only on the rates, length and options, rather than on the sample values,
+    so that they are calculated once when resampling a recording as a series of same-sized chunks (see `resample_plan()`).
+    The arrays are shared between uses of the plan, and so are read-only.
+    """
+
+    def __init__(self, in_frequency, out_frequency, sample_count, lp_filter=True, interpolation_mode='linear'):
+        """
+        :param in_frequency: input data frequency
+        :param out_frequency: output frequency required
+        :param sample_count: number of input samples
+        :param lp_filter: as `resample_fixed()`
+        :param interpolation_mode: as `resample_fixed()`
+        """
+        self.in_frequency = in_frequency
+        self.out_frequency = out_frequency
+        self.sample_count = sample_count
+        self.interpolation_mode = interpolation_mode
+        self.polyphase = interpolation_mode is None or interpolation_mode == 'fir'
+
+        # Calculate
+        self.divisor = math.gcd(in_frequency, out_frequency)
+
+        # Calculate: Upsample: 1:P; Downsample: Q:1
+        self.up_sample = out_frequency // self.divisor
+        self.down_sample = in_frequency // self.divisor
+        self.intermediate_frequency = in_frequency * self.up_sample
+
+        # Calculate: Low-pass filter
+        self.low_pass = 0
+        if lp_filter is not True and lp_filter is not False:
+            self.low_pass = lp_filter
+        elif lp_filter is True and out_frequency < in_frequency:
+            self.low_pass = out_frequency / 2
+
+        # Polyphase FIR window, or custom low-pass cut-off: design the (linear-phase) anti-aliasing filter at the intermediate rate, the same length as the default
+        self.window = ('kaiser', 5.0)
+        if self.polyphase and lp_filter is not True and lp_filter is not False:
+            self.window = scipy.signal.firwin(2 * 10 * max(self.up_sample, self.down_sample) + 1, self.low_pass / (self.intermediate_frequency / 2), window=self.window)
+            self.window.setflags(write=False)
+
+        # Count to ensure 1:N interpolation samples line up with source data, and the number of output samples (the same for the polyphase FIR)
+        if sample_count > 0:
+            self.intermediate_count = (sample_count - 1) * self.up_sample + 1
+            self.output_count = (self.intermediate_count - 1) // self.down_sample + 1
+        else:
+            self.intermediate_count = 0
+            self.output_count = 0
+
+        # Interpolation grids for the upsample stage, and for the time column, in units of input samples
+        # (the upsampled positions are exact fractions of a sample, so line up with the source data)
+        self.in_index = np.arange(sample_count, dtype=np.float64)
+        self.in_index.setflags(write=False)
+        self.intermediate_index = None
+        # Without a low-pass filter between them, upsampling then downsampling only needs the kept intermediate samples: interpolate those directly
+        self.fused = not self.polyphase and self.low_pass <= 0 and self.up_sample > 1 and self.down_sample > 1
+        # For the linear and nearest modes, each intermediate sample is directly a source sample and a whole fraction of the way to the next one (no search needed)
+        self.upsample_lo = None
+        self.upsample_hi = None
+        self.upsample_fraction = None
+        if not self.polyphase and self.up_sample > 1 and sample_count > 0:
+            position = np.arange(0, self.intermediate_count, self.down_sample if self.fused else 1)
+            self.intermediate_index = position / self.up_sample
+            self.intermediate_index.setflags(write=False)
+            if interpolation_mode == 'linear' or interpolation_mode == 'nearest':
+                lo, step = np.divmod(position, self.up_sample)
+                if interpolation_mode == 'nearest':
+                    # (ties to the earlier sample)
+                    self.upsample_lo = lo + (2 * step > self.up_sample)
+                else:
+                    self.upsample_lo = lo
+                    self.upsample_hi = np.minimum(lo + 1, sample_count - 1)
+                    self.upsample_fraction = step / self.up_sample
+                    self.upsample_hi.setflags(write=False)
+                    self.upsample_fraction.setflags(write=False)
+                self.upsample_lo.setflags(write=False)
+        # (the output time is spread across the input time span)
+        self.out_index = np.arange(self.output_count, dtype=np.float64)
+        if self.output_count > 1:
+            self.out_index *= (sample_count - 1) / (self.output_count - 1)
+        self.out_index.setflags(write=False)
+
+
+@lru_cache(maxsize=32)
+def resample_plan(in_frequency, out_frequency, sample_count, lp_filter=True, interpolation_mode='linear'):
+    """
+    Get the (cached) resampling plan for the given rates, input length and options.
+    """
+    return ResamplePlan(in_frequency, out_frequency, sample_count, lp_filter, interpolation_mode)
+
+
+def resample_fixed(sample_values, use_time=None, in_frequency=None, out_frequency=None, lp_filter=True, interpolation_mode='linear', dtype=None, backend='auto', verbose=False):
     """
     Resample a fixed-rate ndarray data to the specified frequency.
 
@@ -26,16 +181,18 @@ def resample_fixed(sample_values, use_time=None, in_frequency=None, out_frequenc
     :param use_time: True/False/None/0 - see above for details
     :param in_frequency: input data frequency, or None to attempt to detect the input frequency, or a list of allowed frequencies to find the nearest match.
     :param out_frequency: output frequency required
-    :param lp_filter: whether to apply a low-pass filter when downsampling
-    :param interpolation_mode: 'nearest', 'linear', 'cubic', 'quadratic', etc.
+    :param lp_filter: whether to apply a low-pass filter when downsampling, or the cut-off frequency (the 'fir' mode always filters, at half the lower rate unless a frequency is given)
+    :param interpolation_mode: 'nearest', 'linear', 'cubic', 'quadratic', etc., or 'fir' (or None) for a polyphase FIR resampler, which includes its own anti-aliasing filter.
+    :param dtype: type for the resampled axes, e.g. np.float32 (ample for the sensor precision) to halve the memory traffic of the interpolation, filter and downsample stages, or None to keep the input type. Any time column is always interpolated separately at full precision.
+    :param backend: for the 'fir' mode: 'auto' to use a GPU (through the optional CuPy package, if installed) for large data, 'cupy' to require it, or 'numpy' for the CPU.
+    :param verbose: Output the resampling plan and stages.
     """
 
     # Frequency from metadata
     if in_frequency is None or hasattr(in_frequency, "__len__"):
-        if hasattr(sample_values, 'dtype') and hasattr(sample_values.dtype, 'metadata') and sample_values.dtype.metadata != None and 'fs' in sample_values.dtype.metadata:
-            in_frequency = sample_values.dtype.metadata['fs']
-        elif hasattr(sample_values, 'attrs') and 'fs' in sample_values.attrs:
-            in_frequency = sample_values.attrs['fs']
+        metadata_frequency = _infer_fs(sample_values)
+        if metadata_frequency is not None:
+            in_frequency = metadata_frequency
     # Estimate sample frequency
     frequency_estimate = None
     if len(sample_values) > 1:
@@ -57,21 +214,6 @@ def resample_fixed(sample_values, use_time=None, in_frequency=None, out_frequenc
     if out_frequency is None:
         raise Exception("RESAMPLE: Invalid output frequency")
 
-    # Calculate
-    divisor = math.gcd(in_frequency, out_frequency)
-
-    # Calculate: Upsample: 1:P; Downsample: Q:1
-    up_sample = out_frequency // divisor
-    down_sample = in_frequency // divisor
-    intermediateFrequency = in_frequency * up_sample
-    
-    # Calculate: Low-pass filter
-    lowPass = 0
-    if lp_filter is not True and lp_filter is not False:
-        lowPass = lp_filter
-    elif lp_filter is True and out_frequency < in_frequency:
-        lowPass = out_frequency / 2
-
     # Time/data
     if len(sample_values.shape) == 1: # Single array
         multi_axis = 0
@@ -88,64 +230,111 @@ def resample_fixed(sample_values, use_time=None, in_frequency=None, out_frequenc
     # If require a time column but don't have one, synthesize one
     if use_time is not None and use_time is not False and use_time is not True:
         time = np.arange(0, len(data)) / in_frequency + use_time
+    # Reduced precision for the axes
+    if dtype is not None:
+        data = data.astype(dtype, copy=False)
+
+    # Rates, filter design and interpolation grids (reused between calls with the same arguments)
+    plan = resample_plan(in_frequency, out_frequency, len(data), lp_filter, interpolation_mode)
+    divisor = plan.divisor
+    up_sample = plan.up_sample
+    down_sample = plan.down_sample
+    intermediateFrequency = plan.intermediate_frequency
+    lowPass = plan.low_pass
 
     # Display plan
-    print('RESAMPLE: gcd %d; %d axes; %d samples; in %d Hz; upsample 1:%d; intermediate %d Hz; low-pass %d Hz; downsample %d:1; out %d Hz;' % (divisor, multi_axis, sample_values.shape[0], in_frequency, up_sample, intermediateFrequency, lowPass, down_sample, out_frequency))
-    print(data)
+    if verbose: print('RESAMPLE: gcd %d; %d axes; %d samples; in %d Hz; upsample 1:%d; intermediate %d Hz; low-pass %d Hz; downsample %d:1; out %d Hz;' % (divisor, multi_axis, sample_values.shape[0], in_frequency, up_sample, intermediateFrequency, lowPass, down_sample, out_frequency))
     
+    # Polyphase FIR: upsample, anti-alias filter and downsample in one pass, only calculating the output samples that are kept
+    if interpolation_mode is None or interpolation_mode == 'fir':
+        if up_sample > 1 or down_sample > 1:
+            if verbose: print('RESAMPLE: Polyphase FIR: %d axes - %d samples at %d Hz --> %d:%d --> %d Hz' % (multi_axis, len(data), in_frequency, up_sample, down_sample, out_frequency))
+            # (when only downsampling, this is a polyphase decimator: the filter is only evaluated at the kept samples)
+            gpu = None
+            if backend == 'cupy' or (backend == 'auto' and data.nbytes >= _GPU_MIN_BYTES):
+                gpu = _cupy()
+                if gpu is None and backend == 'cupy':
+                    raise Exception('RESAMPLE: CuPy backend not available')
+            if gpu is not None:
+                cupy, cupy_signal = gpu
+                if verbose: print('RESAMPLE: (on GPU)')
+                window = plan.window if isinstance(plan.window, tuple) else cupy.asarray(plan.window)
+                data = cupy.asnumpy(cupy_signal.resample_poly(cupy.asarray(data), up_sample, down_sample, axis=0, window=window))
+            else:
+                data = scipy.signal.resample_poly(data, up_sample, down_sample, axis=0, window=plan.window)
+            # Same number of output samples as the separate stages (the time column is interpolated to the output length)
+            if len(data) > 0:
+                data = data[:plan.output_count]
+        else:
+            if verbose: print('RESAMPLE: Resampling not required')
+
     # Upsample: 1:P
-    if up_sample > 1 and len(data) > 0:
+    elif up_sample > 1 and len(data) > 0:
         # Count to ensure 1:N interpolation samples line up with source data
-        intermediateCount = (len(data) - 1) * up_sample + 1
-        print('RESAMPLE: Upsample: %d axes - %d samples at %d Hz --> 1:%d --> %d samples at %d Hz' % (multi_axis, len(data), in_frequency, up_sample, intermediateCount, intermediateFrequency))
+        intermediateCount = plan.intermediate_count
+        if verbose: print('RESAMPLE: Upsample: %d axes - %d samples at %d Hz --> 1:%d --> %d samples at %d Hz' % (multi_axis, len(data), in_frequency, up_sample, intermediateCount, intermediateFrequency))
+        if verbose and plan.fused: print('RESAMPLE: ...only interpolating the %d samples kept by the %d:1 downsample' % (plan.output_count, down_sample))
         # ...
-        inIndex = np.linspace(0, 1, len(data))
-        outIndex = np.linspace(0, 1, intermediateCount)
-        if multi_axis > 0:
-            up_sampled_data = np.empty([intermediateCount, multi_axis])
-            for axis in range(0, multi_axis):
-                up_sampled_data[:,axis] = scipy.interpolate.interp1d(inIndex, data[:,axis], kind=interpolation_mode)(outIndex)
-            data = up_sampled_data
+        inIndex = plan.in_index
+        outIndex = plan.intermediate_index
+        if interpolation_mode == 'nearest':
+            data = data[plan.upsample_lo]
+        elif interpolation_mode == 'linear':
+            fraction = plan.upsample_fraction
+            if data.dtype == np.float32:
+                # Keep reduced-precision input at that precision
+                fraction = fraction.astype(np.float32)
+            if data.ndim > 1:
+                fraction = fraction[:, None]
+            data_lo = data[plan.upsample_lo]
+            data = fraction * (data[plan.upsample_hi] - data_lo) + data_lo
         else:
-            data = scipy.interpolate.interp1d(inIndex, data, kind=interpolation_mode)(outIndex)
-        print(data)
+            # One interpolator over all of the axes (axis=0 is the sample index), rather than one per axis
+            # (the index grid is generated in order, so skip the sort check, and interpolate directly from the input rather than a copy)
+            data = scipy.interpolate.interp1d(inIndex, data, kind=interpolation_mode, axis=0, assume_sorted=True, copy=False, bounds_error=False, fill_value='extrapolate')(outIndex)
+        if dtype is not None:
+            data = data.astype(dtype, copy=False)
     else:
-        print('RESAMPLE: Upsample not required')
+        if verbose: print('RESAMPLE: Upsample not required')
 
-    # Low-pass filter
-    if lowPass > 0:
-        print('RESAMPLE: Low-pass filter at %d Hz (intermediate at %d Hz, output at %d Hz)' % (lowPass, intermediateFrequency, out_frequency))
-        data = filter(data, sample_freq=intermediateFrequency, low_freq=None, high_freq=lowPass)    # order=4, type='butter', method='ba'
-        print(data)
+    # Low-pass filter (included in the polyphase FIR)
+    if interpolation_mode is None or interpolation_mode == 'fir':
+        pass
+    elif lowPass > 0:
+        if verbose: print('RESAMPLE: Low-pass filter at %d Hz (intermediate at %d Hz, output at %d Hz)' % (lowPass, intermediateFrequency, out_frequency))
+        # Zero-phase, so the filtered data stays aligned with the interpolated time column, using second-order sections (stable at reduced precision)
+        data = filter(data, sample_freq=intermediateFrequency, low_freq=None, high_freq=lowPass, method='sos', zero_phase=True)    # order=4, type='butter'
     else:
-        print('RESAMPLE: Low-pass filter not required (not requested, or output frequency is >= input frequency)')
+        if verbose: print('RESAMPLE: Low-pass filter not required (not requested, or output frequency is >= input frequency)')
 
-    # Downsample: Q:1
-    if down_sample > 1 and len(data) > 0:
+    # Downsample: Q:1 (included in the polyphase FIR, or when only the kept samples were interpolated)
+    if interpolation_mode is None or interpolation_mode == 'fir':
+        pass
+    elif plan.fused:
+        if verbose: print('RESAMPLE: Downsample included in upsample')
+    elif down_sample > 1 and len(data) > 0:
         outputCount = (len(data) - 1) // down_sample + 1
-        print('RESAMPLE: Downsample: %d axes - %d samples at %d Hz --> %d:1 --> %d samples at %d Hz' % (multi_axis, len(data), intermediateFrequency, down_sample, outputCount, out_frequency))
-        if multi_axis > 0:
-            data = data[::down_sample,:]
-        else:
-            data = data[::down_sample]
-        print(data)
+        if verbose: print('RESAMPLE: Downsample: %d axes - %d samples at %d Hz --> %d:1 --> %d samples at %d Hz' % (multi_axis, len(data), intermediateFrequency, down_sample, outputCount, out_frequency))
+        # (strides the sample axis, for any number of axes)
+        data = data[::down_sample]
     else:
-        print('RESAMPLE: Downsample not required')
+        if verbose: print('RESAMPLE: Downsample not required')
 
     # Output requires a time column
     if use_time is None or use_time is True:
         # Interpolate time from original time column
-        inIndex = np.linspace(0, 1, len(time))
-        outIndex = np.linspace(0, 1, len(data))
-        time = scipy.interpolate.interp1d(inIndex, time[:], kind='linear')(outIndex)
-        # Join time and data
-        data = np.insert(data, 0, time, axis=1)
+        time = np.interp(plan.out_index, plan.in_index, time)
+        # Join time and data (into one output allocation, at a type that holds both)
+        joined = np.empty((len(data), data.shape[1] + 1), dtype=np.result_type(time, data))
+        joined[:,0] = time
+        joined[:,1:] = data
+        data = joined
 
     return data
 
 
 
-def resample_variable(samples, frequency=None, interpolation_mode='nearest', start_time=None, end_time=None, maximum_missing=7*24*60*60):
+def resample_variable(samples, frequency=None, interpolation_mode='nearest', start_time=None, end_time=None, maximum_missing=7*24*60*60, verbose=False):
     """
     Resample the given ndarray samples (e.g. [[time,accel_x,accel_y,accel_y,*_]]) to be at the fixed frequency specified, 
       based on the time column, interpolating the sample values as required.
@@ -156,14 +345,14 @@ def resample_variable(samples, frequency=None, interpolation_mode='nearest', sta
     :param frequency: fixed frequency required, or None to attempt to detect the input frequency, or a list of allowed frequencies to find the nearest match.
     :param interpolation_mode: 'nearest', 'linear', 'cubic', 'quadratic', etc.
     :param maximum_missing: TODO: maximum missing data (seconds) to fill as empty
+    :param verbose: Output the resampling plan.
     """
 
     # Defaults
     if frequency is None or hasattr(frequency, "__len__"):
-        if hasattr(samples, 'dtype') and hasattr(samples.dtype, 'metadata') and samples.dtype.metadata != None and 'fs' in samples.dtype.metadata:
-            frequency = samples.dtype.metadata['fs']
-        elif hasattr(samples, 'attrs') and 'fs' in samples.attrs:
-            frequency = samples.attrs['fs']
+        metadata_frequency = _infer_fs(samples)
+        if metadata_frequency is not None:
+            frequency = metadata_frequency
     # Determine start/end times
     if start_time is None and len(samples) > 0:
         start_time = samples[0,0]
@@ -194,7 +383,7 @@ def resample_variable(samples, frequency=None, interpolation_mode='nearest', sta
 
     # TODO: Detect chunks of data separated by gaps exceeding the maximum_missing seconds, or where time is not monotonically increasing.
     
-    print("RESAMPLE: %d incoming samples from times %d-%d to %d outgoing samples at %d Hz" % (len(samples), start_time, end_time, sample_count, frequency))
+    if verbose: print("RESAMPLE: %d incoming samples from times %d-%d to %d outgoing samples at %d Hz" % (len(samples), start_time, end_time, sample_count, frequency))
 
     in_timestamps = samples[:,0]
     out_timestamps = start_time + np.arange(0, sample_count) / frequency
@@ -205,8 +394,19 @@ def resample_variable(samples, frequency=None, interpolation_mode='nearest', sta
     resampled_data = np.empty([sample_count, num_axes + 1]) # dtype=rate_type
 
     resampled_data[:,0] = out_timestamps
-    for axis in range(1, num_axes + 1):
-        resampled_data[:,axis] = scipy.interpolate.interp1d(in_timestamps, samples[:,axis], kind=interpolation_mode)(out_timestamps)
+    # Put the samples in time order, if required, so that the order does not need to be checked again by the interpolation
+    in_values = samples[:,1:]
+    if np.any(in_timestamps[1:] < in_timestamps[:-1]):
+        order = np.argsort(in_timestamps, kind='mergesort')
+        in_timestamps = in_timestamps[order]
+        in_values = in_values[order]
+    # The final output time can be just after the last sample (whole number of output samples), so extrapolate
+    if (interpolation_mode == 'linear' or interpolation_mode == 'nearest') and len(samples) > 1:
+        # Common modes: locate the output times once for all of the axes
+        resampled_data[:,1:] = _interpolate_axes(in_timestamps, in_values, out_timestamps, interpolation_mode)
+    else:
+        # One interpolator over all of the axes (axis=0 is the sample index), rather than one per axis
+        resampled_data[:,1:] = scipy.interpolate.interp1d(in_timestamps, in_values, kind=interpolation_mode, axis=0, assume_sorted=True, copy=False, bounds_error=False, fill_value='extrapolate')(out_timestamps)
 
     #samples.attrs['fs'] = frequency
 
@@ -259,5 +459,5 @@ if __name__ == "__main__":
             [10.8,108,208,308],
             [10.9,109,209,309],
             [11.0,110,210,310],
-        ]), use_time=True, out_frequency=5, lp_filter=False)
+        ]), use_time=True, out_frequency=5, lp_filter=False, verbose=True)
     print(data)
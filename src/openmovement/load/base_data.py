@@ -2,18 +2,21 @@
 Base class for timeseries data loader
 """
 
+import os
 from abc import ABC, abstractmethod
 
 class BaseData(ABC):
 
-    def __init__(self, filename, verbose=False):
+    def __init__(self, filename, verbose=False, use_mmap=True):
         """
         Construct a data object from a file.
 
         :param filename: The path to the source file.
         :param verbose: Output more detailed information.
+        :param use_mmap: (Default) memory-map the file; otherwise read the whole file into memory.
         """
         self.verbose = verbose
+        self.use_mmap = use_mmap
         # check if filename is an array of bytes or a string
         self.full_buffer = None
         self.filename = None
@@ -35,10 +38,34 @@ class BaseData(ABC):
 
         if self.verbose: print('Opening file...', flush=True)
         self.fh = open(self.filename, 'rb')
+        # Advise the kernel that the whole file will be read sequentially, so it reads ahead sooner and further (the advice is on the file, whether read or mapped; POSIX only)
+        if hasattr(os, 'posix_fadvise'):
+            try:
+                os.posix_fadvise(self.fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+        if not self.use_mmap:
+            self.full_buffer = self.fh.read()
+            if self.verbose: print('...read ' + str(len(self.full_buffer) / 1024 / 1024) + 'MB', flush=True)
+            return
         try:
             import mmap
-            self.full_buffer = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'PROT_READ'):
+                # POSIX: private read-only mapping (pages are faulted in as they are read, so header-only use does not read the whole file)
+                self.full_buffer = mmap.mmap(self.fh.fileno(), 0, flags=mmap.MAP_PRIVATE, prot=mmap.PROT_READ)
+            else:
+                # Windows: read-only mapping
+                self.full_buffer = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ)
             if self.verbose: print('...mapped ' + str(len(self.full_buffer) / 1024 / 1024) + 'MB', flush=True)
+            # The mapping keeps its own reference to the file, so the buffered handle is no longer needed
+            # (all reads are through the mapping, this avoids a second buffered-I/O path over the same file)
+            self.fh.close()
+            self.fh = None
+            # Advise that the data will be read sequentially (not available on all platforms)
+            try:
+                self.full_buffer.madvise(mmap.MADV_SEQUENTIAL)
+            except (AttributeError, OSError):
+                pass
         except Exception as e:
             print('WARNING: Problem using mmap (' + str(e) +') - falling back to reading whole file...', flush=True)
             self.full_buffer = self.fh.read()
@@ -57,9 +84,24 @@ class BaseData(ABC):
     def __del__(self):
         self.close()
 
-    # Iterate
+    # Iterate rows, a chunk at a time
     def __iter__(self):
-        return iter(self.get_sample_values())
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def iter_chunks(self, chunk_size=65536):
+        """
+        Iterate over the sample values in consecutive chunks of rows.
+
+        This default yields views of `get_sample_values()`; a loader can override it to decode each chunk
+        as it is needed, so that the whole recording is not held in memory at once.
+
+        :param chunk_size: The (maximum) number of rows in each chunk.
+        :returns: An iterator of ndarray chunks, each with the same columns as `get_sample_values()`.
+        """
+        sample_values = self.get_sample_values()
+        for start in range(0, len(sample_values), chunk_size):
+            yield sample_values[start:start + chunk_size]
 
     @abstractmethod
     def close(self):
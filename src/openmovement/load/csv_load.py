@@ -1,26 +1,76 @@
 import csv
+import io
+import os
 import re
 import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
 
+# Optional: PyArrow's multi-threaded CSV reader is used, if installed
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:
+    pyarrow = None
+
 from openmovement.load.base_data import BaseData
 
 
+# Number of rows parsed at a time
+_CSV_CHUNK_ROWS = 1 << 18
+
+# Number of threads used to parse newline-aligned ranges of larger files (the pandas tokenizer releases the GIL for much of its work)
+_CSV_PARSE_WORKERS = min(4, os.cpu_count() or 1)
+_CSV_PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+# Number of lines in a buffer (counted in blocks, as a memory-mapped file has no count())
+def _count_lines(buffer, block_size=16 * 1024 * 1024):
+    count = 0
+    for offset in range(0, len(buffer), block_size):
+        count += buffer[offset:offset + block_size].count(b'\n')
+    # Final line without a line ending
+    if len(buffer) > 0 and buffer[len(buffer) - 1:len(buffer)] != b'\n':
+        count += 1
+    return count
+
+# Strings in parentheses (e.g. units), and runs of spaces
+_RE_BRACKETED = re.compile(r'\(.*?\)')
+_RE_MULTI_SPACE = re.compile(r' +')
+
+
+# Check for a formatted absolute date/time: 'YYYY-MM-DD hh:mm:ss', with a ' ' or 'T' separator, optional fractions of a second, optional 'Z' or timezone offset
+# (fixed character positions, without a regular expression)
+def _is_absolute_datetime(value):
+    if len(value) < 19 or value[4] != '-' or value[7] != '-' or value[10] not in 'T ' or value[13] != ':' or value[16] != ':':
+        return False
+    if not (value[0:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16] + value[17:19]).isdecimal():
+        return False
+    rest = value[19:]
+    # Optional fractions of a second
+    if rest.startswith('.'):
+        end = 1
+        while end < len(rest) and rest[end].isdecimal():
+            end += 1
+        if end == 1:
+            return False
+        rest = rest[end:]
+    # Optional zone
+    return rest == '' or rest == 'Z' or (len(rest) == 6 and rest[0] in '+-' and rest[3] == ':' and (rest[1:3] + rest[4:6]).isdecimal())
+
+
 # Normalize the column labels (e.g. 'Time' to 'time'; 'Accel-X (g)' to 'accel_x'; 'Gyro-Z (d/s)' to 'gyro_z')
 def _normalize_label(label):
     if label is None:
         return None     # Or '' ?
     
     # Remove any strings in parentheses (e.g. units)
-    reRemoveBracketed = re.compile('\(.*?\)')
-    label = reRemoveBracketed.sub('', label)
+    label = _RE_BRACKETED.sub('', label)
 
     # Remove any multiple spaces
-    reRemoveMultipleSpace = re.compile(' +')
-    label = reRemoveMultipleSpace.sub(' ', label)
+    label = _RE_MULTI_SPACE.sub(' ', label)
 
     # Remove any leading/trailing spaces
     label = label.strip()
@@ -35,6 +85,59 @@ def _normalize_label(label):
     return label
 
 
+# Whether a field parses as a number
+def _is_numeric(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+# Fast path for the common plain comma-separated layout: returns (dialect, has_header), or None where the csv.Sniffer heuristics are needed
+def _plain_csv_dialect(initial_lines):
+    # Only the first few lines are needed, and they must be unquoted, comma-separated, without padding or other candidate delimiters
+    lines = initial_lines[0:2]
+    for line in lines:
+        if ',' not in line or any(c in line for c in '";\t') or ', ' in line:
+            return None
+    first_field = lines[0].split(',', 1)[0]
+    second_field = lines[1].split(',', 1)[0]
+    # Data rows start with a number or an absolute date/time
+    if not (_is_numeric(second_field) or _is_absolute_datetime(second_field)):
+        return None
+    if _is_numeric(first_field) or _is_absolute_datetime(first_field):
+        has_header = False
+    elif first_field.strip() != '' and lines[0].count(',') == lines[1].count(','):
+        has_header = True
+    else:
+        return None
+    return csv.excel, has_header
+
+
+# Width of the byte strings that absolute timestamps are read into (longer than any ISO 8601 date/time with nanoseconds and a zone offset)
+_ISO_TIMESTAMP_WIDTH = 40
+
+# Decode fixed-width ISO 8601 date/time byte strings to int64 nanoseconds since the epoch, None if any could not be (or have a zone offset)
+def _iso_timestamps_ns(values):
+    # (a copy, as older Pandas versions give an object array of bytes)
+    values = np.array(values, dtype='S' + str(_ISO_TIMESTAMP_WIDTH))
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    characters = values.view(np.uint8).reshape(len(values), -1)
+    # Values filling the width may have been truncated
+    if characters[:, -1].any():
+        return None
+    # A 'Z' (UTC) suffix is equivalent to no zone, other zone offsets are left to Pandas
+    characters[characters == ord('Z')] = 0
+    if np.isin(characters[:, 11:], (ord('+'), ord('-'))).any():
+        return None
+    try:
+        return values.astype('datetime64[ns]').view(np.int64)
+    except ValueError:
+        return None
+
+
 # Convert a timestamp-with-no-timezone into a datetime (using UTC even though unknown zone, alternative is naive datetime which is assumed to be in the current local computer's time)
 def _csv_datetime(timestamp):
     return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
@@ -54,6 +157,22 @@ def _csv_datetime_ms_string(time):
     return time.isoformat(sep=' ',timespec='milliseconds')[0:23]
 
 
+# Convert an array of timestamps-with-no-timezone (seconds since the epoch, or datetime64) into ISO-ish byte strings, optionally with milliseconds (a vectorized form of the two functions above)
+def _csv_datetime_strings(times, milliseconds=False):
+    unit = 'ms' if milliseconds else 's'
+    width = 23 if milliseconds else 19
+    times = np.asarray(times)
+    if not np.issubdtype(times.dtype, np.datetime64):
+        # Rounded to whole microseconds from the whole and fractional seconds separately (as datetime.fromtimestamp), the strings are then truncated to the unit as the functions above
+        seconds = np.floor(times)
+        times = (seconds.astype(np.int64) * 1000000 + np.round((times - seconds) * 1e6).astype(np.int64)).astype('datetime64[us]')
+    strings = np.atleast_1d(np.datetime_as_string(times.astype('datetime64[' + unit + ']'), unit=unit).astype('S' + str(width)))
+    # Space-separated date and time (in place, through a view of the characters)
+    separator = strings.reshape(-1).view(np.uint8).reshape(-1, width)[:, 10]
+    separator[separator == ord('T')] = ord(' ')
+    return strings.reshape(times.shape)
+
+
 class CsvData(BaseData):
     """
     Timeseries .CSV data.
@@ -69,21 +188,31 @@ class CsvData(BaseData):
         if self.verbose: print('Parsing header...', flush=True)
 
         # Take an initial chunk of data to inspect
-        initial_chunk = self.full_buffer[0:4096].decode(encoding='utf-8')
+        # (plain ASCII is decoded directly, otherwise as UTF-8 where a character split at the end of the chunk, or any stray binary, is replaced rather than an error)
+        initial_bytes = bytes(self.full_buffer[0:4096])
+        try:
+            initial_chunk = initial_bytes.decode('ascii')
+        except UnicodeDecodeError:
+            initial_chunk = initial_bytes.decode('utf-8', errors='replace')
         if len(initial_chunk) == 0:
             raise Exception('File has no data')
         initial_lines = initial_chunk.splitlines()
         if len(initial_lines) < 2:
             raise Exception('File has insufficient data (or initial header/row too long)')
 
-        # Open to inspect header and data format
-        sniffer = csv.Sniffer()
-        dialect = sniffer.sniff(initial_chunk)
+        # Open to inspect header and data format (plain comma-separated data avoids the sniffer's heuristics)
+        plain = _plain_csv_dialect(initial_lines)
+        if plain is not None:
+            dialect, has_header = plain
+        else:
+            sniffer = csv.Sniffer()
+            dialect = sniffer.sniff(initial_chunk)
+            has_header = sniffer.has_header(initial_chunk)
 
         # Process the first CSV row
         self.header = None
         csv_reader = csv.reader(initial_lines, dialect) # quoting=csv.QUOTE_NONNUMERIC
-        if sniffer.has_header(initial_chunk):
+        if has_header:
             self.header = next(csv_reader)
         try:
             first_row = next(csv_reader)
@@ -103,11 +232,8 @@ class CsvData(BaseData):
         # Derive labels from header
         self.labels = list(map(_normalize_label, self.header))
 
-        # RegExp to match a formatted absolute date/time (an optional 'T', optional fractions of a second, optional 'Z' or timezone offset)
-        date_time_re = re.compile('^\d\d\d\d-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[-+]\d\d:\d\d)?$')
-
         # Decide the type of timestamps we have based on the column heading or data format
-        if self.num_columns > 0 and date_time_re.match(first_row[0]):
+        if self.num_columns > 0 and _is_absolute_datetime(first_row[0]):
             self.timestamps_absolute = True     # Timestamps are absolute date/times
             if self.verbose: print('Timestamps: absolute')
         elif len(self.header) > 0 and (_normalize_label(self.header[0]) == 'time' or self.force_time):
@@ -122,36 +248,158 @@ class CsvData(BaseData):
             self.labels[0] = 'time'
 
 
-    def _parse_data(self):
-        if self.timestamps_absolute == True:
-            if self.verbose: print('Parsing data (timestamps)...', flush=True)
-            # Read timestamped data with Pandas (slightly faster than numpy)
-            pd_data = pd.read_csv(
-                self.full_buffer, 
-                parse_dates=[0], # parse_dates=['date_utc'], 
-                infer_datetime_format=True, 
-                sep=',', 
-                usecols=list(range(0, self.num_columns)),
-                header=None,        # We've already inspected the headers
-                skiprows=[0] if self.has_header else [],
-                names=self.labels,
+    # Types of the value columns by label, from the dtypes option
+    def _value_dtypes(self):
+        if self.dtypes is None:
+            return {}
+        value_labels = self.labels[1:] if self.timestamps_absolute is not None else self.labels
+        if isinstance(self.dtypes, dict):
+            return {label: np.dtype(self.dtypes[label]) for label in value_labels if label in self.dtypes}
+        return {label: np.dtype(self.dtypes) for label in value_labels}
+
+
+    # Parse the data with PyArrow (multi-threaded), returns False if the data is not suitable to read this way
+    def _parse_data_pyarrow(self):
+        if self.verbose: print('Parsing data (pyarrow)...', flush=True)
+        # Read the file directly (the reader threads can otherwise hold an export of the mapped buffer for a time, preventing it from closing)
+        source = self.filename if self.filename is not None else pyarrow.py_buffer(self.full_buffer)
+        try:
+            table = pyarrow.csv.read_csv(
+                source,
+                read_options=pyarrow.csv.ReadOptions(use_threads=True, block_size=8 << 20, column_names=self.labels, skip_rows=1 if self.has_header else 0),
+                parse_options=pyarrow.csv.ParseOptions(delimiter=','),
+                convert_options=pyarrow.csv.ConvertOptions(column_types={label: pyarrow.from_numpy_dtype(dtype) for label, dtype in self._value_dtypes().items()}),
             )
-            # Standardized to create a single ndarray -- convert from datetime64[ns] to time since epoch in seconds
-            pd_data.iloc[:,0] = pd.to_numeric(pd_data.iloc[:,0]) / 1e9
+        except (pyarrow.ArrowException, ValueError) as e:
+            if self.verbose: print('...not parsed with pyarrow (' + str(e) + ')', flush=True)
+            return False
+
+        columns = [table.column(i) for i in range(table.num_columns)]
+        if self.timestamps_absolute == True:
+            # Timestamps must have been recognized
+            if not pyarrow.types.is_timestamp(columns[0].type):
+                if self.verbose: print('...timestamps not parsed with pyarrow', flush=True)
+                return False
+            # Nanoseconds since the epoch (UTC if a zone was given)
+            columns[0] = columns[0].cast(pyarrow.timestamp('ns', tz=columns[0].type.tz)).cast(pyarrow.int64())
+        # Release the table, and each Arrow column as soon as it is converted (a multi-block column is copied), so only one is ever held twice
+        del table
+        for i in range(len(columns)):
+            columns[i] = columns[i].to_numpy()
+        self._columns = columns
+        return True
+
+
+    def _parse_data(self):
+        # The data is stored by column (one ndarray per label), and only combined into a single ndarray of sample values if requested.
+        # Absolute timestamps are kept as int64 nanoseconds since the epoch (and are only converted to seconds for the sample values).
+        self._columns = None
+        self._time_ns = None
+        self.sample_values = None
+
+        if pyarrow is not None and self._parse_data_pyarrow():
+            if self.timestamps_absolute == True:
+                self._time_ns = self._columns[0]
+            return
+
+        # The parser reads the memory-mapped file in chunks as a file-like object, or in-memory bytes through a stream that shares (rather than copies) them
+        source = io.BytesIO(self.full_buffer) if isinstance(self.full_buffer, bytes) else self.full_buffer
+
+        if self.verbose: print('Parsing data (' + ('timestamps' if self.timestamps_absolute == True else 'non/numeric timestamps') + ')...', flush=True)
+        if _CSV_PARSE_WORKERS > 1 and len(self.full_buffer) >= _CSV_PARALLEL_MIN_BYTES:
+            # Split into roughly equal byte ranges, each boundary moved forward to the start of the next line, and parse the ranges in parallel
+            size = len(self.full_buffer) // _CSV_PARSE_WORKERS
+            boundaries = [0]
+            for i in range(1, _CSV_PARSE_WORKERS):
+                boundary = self.full_buffer.find(b'\n', max(i * size, boundaries[-1])) + 1
+                if boundary <= 0:
+                    break
+                boundaries.append(boundary)
+            boundaries.append(len(self.full_buffer))
+            ranges = [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+            with ThreadPoolExecutor(max_workers=_CSV_PARSE_WORKERS) as executor:
+                range_columns = list(executor.map(lambda byte_range: self._parse_range(byte_range[0], byte_range[1]), ranges))
+            self._columns = [np.concatenate(columns) for columns in zip(*range_columns)]
         else:
-            if self.verbose: print('Parsing data (non/numeric timestamps)...', flush=True)
-            # Read numeric or non-timestamped data with Pandas
-            pd_data = pd.read_csv(
-                self.full_buffer, 
-                infer_datetime_format=True, 
-                sep=',', 
-                usecols=list(range(0, self.num_columns)),
-                header=None,        # We've already inspected the headers
-                skiprows=[0] if self.has_header else [],
-                names=self.labels,
-            )
+            self._columns = self._parse_range(0, len(self.full_buffer), source)
+        if self.timestamps_absolute == True:
+            self._time_ns = self._columns[0]
 
-        self.sample_values = pd_data.to_numpy()
+
+    # Parse the lines in a byte range of the buffer (the first range includes any header)
+    def _parse_range(self, start, end, source=None):
+        if source is None:
+            data = self.full_buffer[start:end]
+            source = io.BytesIO(data)
+        else:
+            data = self.full_buffer
+        skip_header = self.has_header and start == 0
+        row_estimate = max(_count_lines(data) - (1 if skip_header else 0), 0)
+        # All values should be plain numbers (after any ISO date/time), so first try without checking each field against the missing-value strings
+        try:
+            columns = self._read_csv_columns(source, row_estimate, skip_header, numeric_only=True)
+        except ValueError:
+            columns = None      # (e.g. a missing value in a column read as an integer type)
+        if columns is None:
+            if self.verbose: print('Parsing data (with missing values, or other date/time formats)...', flush=True)
+            source.seek(0)
+            columns = self._read_csv_columns(source, row_estimate, skip_header)
+        return columns
+
+
+    # Read the data with Pandas, returns None if numeric_only and a column contained anything but numbers (after any ISO date/time)
+    def _read_csv_columns(self, source, row_estimate, skip_header, numeric_only=False):
+        # Absolute timestamps are either read as fixed-width byte strings and decoded by NumPy (avoiding a string object per row), or parsed by Pandas
+        iso_timestamps = numeric_only and self.timestamps_absolute == True
+        # Read with Pandas in chunks of rows, into columns allocated for the estimated number of rows (rather than the whole file into a DataFrame, then copying out)
+        reader = pd.read_csv(
+            source,
+            parse_dates=[0] if self.timestamps_absolute == True and not iso_timestamps else False,
+            dtype={**self._value_dtypes(), **({self.labels[0]: 'S' + str(_ISO_TIMESTAMP_WIDTH)} if iso_timestamps else {})},
+            sep=',', 
+            usecols=list(range(0, self.num_columns)),
+            header=None,        # We've already inspected the headers
+            skiprows=[0] if skip_header else [],
+            names=self.labels,
+            na_filter=not numeric_only,     # (any empty or non-numeric field then gives a column of strings)
+            chunksize=_CSV_CHUNK_ROWS,
+        )
+        columns = None
+        count = 0
+        for chunk in reader:
+            chunk_columns = [chunk.iloc[:,i].to_numpy() for i in range(chunk.shape[1])]
+            if iso_timestamps:
+                chunk_columns[0] = _iso_timestamps_ns(chunk_columns[0])
+            if numeric_only and any(values is None or values.dtype.kind not in 'biuf' for values in chunk_columns):
+                reader.close()
+                return None
+            if self.timestamps_absolute == True and not iso_timestamps:
+                # Nanoseconds since the epoch (UTC if a zone was given)
+                time_column = chunk.iloc[:,0]
+                if time_column.dt.tz is not None:
+                    time_column = time_column.dt.tz_convert(None)
+                chunk_columns[0] = time_column.to_numpy().astype('datetime64[ns]').view(np.int64)
+            if columns is None:
+                columns = [np.empty(max(row_estimate, len(chunk)), dtype=values.dtype) for values in chunk_columns]
+            for i, values in enumerate(chunk_columns):
+                column = columns[i]
+                # Promote the column type if required (e.g. whole numbers followed by decimals)
+                if not np.can_cast(values.dtype, column.dtype):
+                    column = column.astype(np.result_type(column, values))
+                # Grow if the estimate was too low (e.g. unusual line endings)
+                if count + len(values) > len(column):
+                    grown = np.empty(max(2 * len(column), count + len(values)), dtype=column.dtype)
+                    grown[:count] = column[:count]
+                    column = grown
+                column[count:count + len(values)] = values
+                columns[i] = column
+            count += len(chunk)
+            # Release this chunk before the next is parsed
+            del chunk, chunk_columns
+        if columns is None:
+            columns = [np.empty(0) for _ in self.labels]
+        # (trim any over-estimate, e.g. from blank lines)
+        return [column[:count] for column in columns]
 
             
     def _interpret_samples(self):
@@ -160,52 +408,64 @@ class CsvData(BaseData):
         # If we don't have any timestamps, but do have an assumed frequency, synthesize relative timestamps
         if self.timestamps_absolute is None and self.assumed_frequency is not None:
             if self.verbose: print('Timestamps: synthesize->numeric')
-            timestamps = np.arange(self.sample_values.shape[0]) / self.assumed_frequency
-            self.sample_values = np.insert(self.sample_values, 0, timestamps, axis=1)
+            # (a new leading column, without copying the others; divided in place rather than allocating a second array)
+            timestamps = np.arange(self._num_samples, dtype=np.float64)
+            timestamps /= self.assumed_frequency
+            self._columns.insert(0, timestamps)
+            self.labels.insert(0, 'time')
             self.timestamps_absolute = False
 
         # Where timestamps are relative, add any supplied start time
         if self.timestamps_absolute == False and self.start_time != 0:
             if self.verbose: print('Timestamps: numeric + offset')
-            self.sample_values[:,0] += self.start_time
+            self._columns[0] = self._columns[0] + self.start_time
 
         # Start by taking the assumed frequency
         self.frequency = self.assumed_frequency
 
         # Where possible, estimate the sample frequency from the timestamps
         # Can't assume that the data is uninterrupted, so not just the inverse of the mean frequency from the overall duration divided by number of samples
-        if self.timestamps_absolute is not None and self.sample_values.shape[0] > 1:
-            # Consider the timestamps (in seconds)
-            timestamps = self.sample_values[:,0]
+        if self.timestamps_absolute is not None and self._num_samples > 1:
+            # Consider the timestamps (in seconds, or nanoseconds if absolute)
+            if self._time_ns is not None:
+                timestamps = self._time_ns
+                units_per_second = 1e9
+            else:
+                timestamps = self._columns[0]
+                units_per_second = 1.0
             # Sample N pairs of adjacent times linearly throughout the data
             num_pairs = 100
             first_index = 0
             last_index = timestamps.shape[0] - 1    # each index must form a pair with the subsequent one
-            sample_index = (np.arange(0, num_pairs) * ((last_index - first_index) / num_pairs) + first_index).astype(int)
-            # Calculate the interval between subsequent indexes
+            sample_index = np.arange(0, num_pairs, dtype=np.int64) * (last_index - first_index) // num_pairs + first_index
+            # Calculate the interval between subsequent indexes (gathered from only these positions, in the column's own integer or float type)
             intervals = timestamps[sample_index + 1] - timestamps[sample_index]
-            # Take the median value as the interval
+            # Take the median value as the interval (np.median selects by partitioning, and integer nanosecond intervals stay exact)
             median_interval = np.median(intervals)
             # The frequency estimate is the inverse
-            self.frequency = round(1.0 / median_interval, 0)
+            self.frequency = round(units_per_second / median_interval, 0)
 
             if self.verbose: print('Frequency estimate: ' + str(self.frequency))
 
 
-    def __init__(self, filename, verbose=False, force_time=True, start_time=0, assumed_frequency=None):
+    def __init__(self, filename, verbose=False, force_time=True, start_time=0, assumed_frequency=None, dtypes=None):
         """
         :param filename: The path to the .CSV file
         :param verbose: Output more detailed information.
         :param force_time: First column to be treated as time even if it doesn't look like an absolute timestamp and doesn't have a column header similar to 'time'.
         :param start_time: Seconds since the epoch to use as an initial time to use for relative numeric (rather than absolute) timestamps, or where the time is missing.
         :param assumed_frequency: Sampling frequency to assume if no timestamps are given.
+        :param dtypes: Type to read the (non-time) values as, e.g. np.float32 or np.int16 to halve the memory use or more, either a single type or a dict of types by column label (None for the types inferred from the data).
         """
         super().__init__(filename, verbose)
         self.force_time = force_time
         self.start_time = start_time
         self.assumed_frequency = assumed_frequency
+        self.dtypes = dtypes
 
         self.all_data_read = False
+        self._num_samples = None
+        self._start_time = None
 
         self._read_data()
         self._parse_header()
@@ -214,15 +474,16 @@ class CsvData(BaseData):
 
     # Current model reads all of the data in one go (and releases the file)
     def _ensure_all_data_read(self):
-        start_time = time.time()
         if self.all_data_read:
             return
+        # (only timed when reporting)
+        start_time = time.time() if self.verbose else 0
         self.all_data_read = True
         self._parse_data()
+        self._num_samples = self._columns[0].shape[0] if len(self._columns) > 0 else 0
         self._interpret_samples()
 
-        elapsed_time = time.time() - start_time
-        if self.verbose: print('Read done... (elapsed=' + str(elapsed_time) + ')', flush=True)
+        if self.verbose: print('Read done... (elapsed=' + str(time.time() - start_time) + ')', flush=True)
         self.close()
 
     def close(self):
@@ -246,8 +507,20 @@ class CsvData(BaseData):
                   where 'time' is normalized to seconds since the epoch if from timestamps.
         """
         self._ensure_all_data_read()
+        if self.sample_values is None:
+            # Combine the columns (with any absolute timestamps in seconds)
+            columns = self._columns
+            if self._time_ns is not None:
+                columns = [self._time_ns / 1e9] + columns[1:]
+            self.sample_values = np.column_stack(columns) if len(columns) > 0 else np.empty((0, 0))
         return self.sample_values
 
+    # DataFrame of the given columns (without copying them), labelled by position so that any repeated labels are kept
+    def _columns_dataframe(self, columns):
+        samples = pd.DataFrame(dict(enumerate(columns)), copy=False)
+        samples.columns = self.labels
+        return samples
+
     def get_samples(self, use_datetime64=True):
         """
         Return an DataFrame, e.g. (time, accel_x, accel_y, accel_z)
@@ -257,30 +530,39 @@ class CsvData(BaseData):
         self._ensure_all_data_read()
         if self.timestamps_absolute is not None and use_datetime64:
             if self.verbose: print('Converting time...', flush=True)
-            # Samples exclude the current time (float seconds) column
-            samples = pd.DataFrame(self.sample_values[:,1:], columns=self.labels[1:])
-            # Convert the float epoch time in seconds to a datetime64 integer in nanoseconds (Pandas default)
-            time = (self.sample_values[:,0] * 1_000_000_000).astype('datetime64[ns]')
-            # Add time as first column
-            samples.insert(0, self.labels[0], time, True)
+            if self._time_ns is not None:
+                # The original timestamps, in datetime64 integer nanoseconds (Pandas default), without a copy
+                time = self._time_ns.view('datetime64[ns]')
+            else:
+                # Convert the float epoch time in seconds to a datetime64 integer in nanoseconds (Pandas default)
+                time = (self._columns[0] * 1_000_000_000).astype('datetime64[ns]')
+            samples = self._columns_dataframe([time] + self._columns[1:])
             if self.verbose: print('...done', flush=True)
+        elif self._time_ns is not None:
+            # Absolute time in seconds
+            samples = self._columns_dataframe([self._time_ns / 1e9] + self._columns[1:])
         else:
             # Keep time (if used) in seconds
-            samples = pd.DataFrame(self.sample_values, columns=self.labels)
+            samples = self._columns_dataframe(self._columns)
 
         # Add sample metadata (start time in seconds since epoch, and configured sample frequency)
         samples.attrs['time'] = self.get_start_time()
         samples.attrs['fs'] = self.get_sample_rate()
         return samples
 
-    # Time of first sample (seconds since epoch)
+    # Time of first sample (seconds since epoch), determined once
     def get_start_time(self):
-        self._ensure_all_data_read()
-        # For non-timestamped data, start at the given origin
-        if self.timestamps_absolute is None:
-            return self.start_time
-        # Otherwise, the time of the first sample
-        return self.sample_values[0,0]
+        if self._start_time is None:
+            self._ensure_all_data_read()
+            # For non-timestamped data, start at the given origin
+            if self.timestamps_absolute is None:
+                self._start_time = self.start_time
+            # Otherwise, the time of the first sample
+            elif self._time_ns is not None:
+                self._start_time = self._time_ns[0] / 1e9
+            else:
+                self._start_time = self._columns[0][0]
+        return self._start_time
 
     def get_sample_rate(self):
         self._ensure_all_data_read()
@@ -288,8 +570,7 @@ class CsvData(BaseData):
 
     def get_num_samples(self):
         self._ensure_all_data_read()
-        return self.sample_values.shape[0]
-
+        return self._num_samples
 
 
 def main():
@@ -4,43 +4,56 @@ Dan Jackson, Open Movement, 2017-2021
 Derived from cwa_metadata.py CWA Metadata Reader by Dan Jackson, Open Movement.
 """
 
+import mmap
+import os
 import sys
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from struct import *
+from urllib.parse import unquote_plus
 
 import numpy as np
 import pandas as pd
 
 from openmovement.load.base_data import BaseData
+from openmovement.load.csv_load import _csv_datetime_strings
 
 SECTOR_SIZE = 512
 EPOCH = datetime(1970, 1, 1)
 
 
-def _fast_timestamp(value):
-    """Faster date/time parsing.  This does not include 'always' limits; invalid dates do not cause an error; the first call will be slower as a lookup table is created."""
-    # On first run, build lookup table for initial 10-bits of the packed date-time parsing, minus one day as days are 1-indexed
-    if not hasattr(_fast_timestamp, "SECONDS_BEFORE_YEAR_MONTH"):
-        _fast_timestamp.SECONDS_BEFORE_YEAR_MONTH = [0] * 1024        # YYYYYYMM MM (Y=years since 2000, M=month-of-year 1-indexed)
-        SECONDS_PER_DAY = 24 * 60 * 60
-        DAYS_IN_MONTH = [ 0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31, 0, 0, 0 ]    # invalid month 0, months 1-12 (non-leap-year), invalid months 13-15
-        seconds_before = 946684800      # Seconds from UNIX epoch (1970) until device epoch (2000)
-        for year in range(0, 64):       # 2000-2063
-            for month in range(0, 16):  # invalid month 0, months 1-12, invalid months 13-15
-                index = (year << 4) + month
-                _fast_timestamp.SECONDS_BEFORE_YEAR_MONTH[index] = seconds_before - SECONDS_PER_DAY    # minus one day as day-of-month is 1-based
-                days = DAYS_IN_MONTH[month]
-                if year % 4 == 0 and month == 2:    # Correct for this year range (2000 was a leap year, despite being a multiple of 100, as it is a multiple of 400)
-                    days += 1
-                seconds_before += days * SECONDS_PER_DAY
+def _seconds_before_year_month_table():
+    """Lookup table (as an ndarray) for the initial 10-bits of the packed date-time (YYYYYYMM MM), as seconds since the epoch minus one day (as days are 1-indexed)."""
+    table = np.zeros(1024, dtype=np.int64)
+    SECONDS_PER_DAY = 24 * 60 * 60
+    DAYS_IN_MONTH = [ 0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31, 0, 0, 0 ]    # invalid month 0, months 1-12 (non-leap-year), invalid months 13-15
+    seconds_before = 946684800      # Seconds from UNIX epoch (1970) until device epoch (2000)
+    for year in range(0, 64):       # 2000-2063
+        for month in range(0, 16):  # invalid month 0, months 1-12, invalid months 13-15
+            table[(year << 4) + month] = seconds_before - SECONDS_PER_DAY
+            days = DAYS_IN_MONTH[month]
+            if year % 4 == 0 and month == 2:    # Correct for this year range (2000 was a leap year, despite being a multiple of 100, as it is a multiple of 400)
+                days += 1
+            seconds_before += days * SECONDS_PER_DAY
+    return table
+
+# Built once at import: as an ndarray for whole columns, and as a tuple for faster single-value look-ups
+_SECONDS_BEFORE_YEAR_MONTH = _seconds_before_year_month_table()
+_SECONDS_BEFORE_YEAR_MONTH_TUPLE = tuple(_SECONDS_BEFORE_YEAR_MONTH.tolist())
+
 
+def _fast_timestamp(value):
+    """Faster date/time parsing, of a single value or (element-wise) an integer ndarray.  This does not include 'always' limits; invalid dates do not cause an error."""
+    table = _SECONDS_BEFORE_YEAR_MONTH if isinstance(value, np.ndarray) else _SECONDS_BEFORE_YEAR_MONTH_TUPLE
     year_month = (value >> 22) & 0x3ff
     day   = (value >> 17) & 0x1f
     hours = (value >> 12) & 0x1f
     mins  = (value >>  6) & 0x3f
     secs  = value & 0x3f
-    return _fast_timestamp.SECONDS_BEFORE_YEAR_MONTH[year_month] + ((day * 24 + hours) * 60 + mins) * 60 + secs
+    return table[year_month] + ((day * 24 + hours) * 60 + mins) * 60 + secs
 
 
 def _parse_timestamp(value):
@@ -69,24 +82,50 @@ def _parse_timestamp(value):
 
 def _checksum(data):
     """16-bit checksum for data blocks (should sum to zero)"""
-    sum = 0
-    for i in range(0, len(data), 2):
-        #value = data[i] | (data[i + 1] << 8)
-        value = unpack('<H', data[i:i+2])[0]
-        sum = (sum + value) & 0xffff
-    return sum
+    # Word-wise sum of the little-endian 16-bit values, as a single reduction
+    return int(np.frombuffer(data, dtype=np.dtype('<u2'), count=len(data) // 2).sum(dtype=np.uint64) & 0xffff)
+
+def _unpack10_table():
+    """Lookup table of the signed value for each 12-bit (exponent << 10 | 10-bit mantissa) packed axis."""
+    index = np.arange(4096, dtype=np.int32)
+    return ((((index & 0x3ff) ^ 0x0200) - 0x0200) << (index >> 10)).astype(np.int16)
+
+# Built once at import for single-value unpacking
+_UNPACK10 = _unpack10_table().tolist()
+
+# Temperature (degrees C) for each 10-bit raw reading, looked up per-sector rather than calculated
+_TEMPERATURE_TABLE = np.arange(1024) * (75.0 / 256) - 50
+
 
 def _dword_unpack(value):
     """Unpack a single DWORD-packed triaxial value"""
-    # eezzzzzz zzzzyyyy yyyyyyxx xxxxxxxx
-    exponent = value >> 30
-    x = ((((value      ) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
-    y = ((((value >> 10) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
-    z = ((((value >> 20) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
+    # eezzzzzz zzzzyyyy yyyyyyxx xxxxxxxx -- each axis is a table look-up of its 10 bits with the shared 2-bit exponent
+    exponent = (value >> 20) & 0xc00
+    x = _UNPACK10[((value      ) & 0x3ff) | exponent]
+    y = _UNPACK10[((value >> 10) & 0x3ff) | exponent]
+    z = _UNPACK10[((value >> 20) & 0x3ff) | exponent]
     return (x, y, z)
 
+def _unpack_dword_batch(values, out):
+    """Unpack an array of DWORD-packed triaxial values (3x 10-bit signed + 2-bit exponent) in to a preallocated (values.size, 3) output array"""
+    # eezzzzzz zzzzyyyy yyyyyyxx xxxxxxxx -- each 10-bit field is shifted to the top of a signed 32-bit value and
+    # arithmetic-shifted back down, which sign-extends it, then scaled by the exponent.  One int32 temporary is reused
+    # in-place for each axis (column-at-a-time is faster than a broadcast (N, 3) pass, which has a strided inner loop).
+    # (all of the passes are over contiguous int32 arrays, so take NumPy's vectorized SIMD loops)
+    packed = np.ascontiguousarray(values).reshape(-1)
+    exponent = (packed >> 30).view(np.int32)        # unsigned shift, so no masking needed
+    packed = packed.view(np.int32)
+    temp = np.empty_like(packed)
+    for axis, shift in enumerate((22, 12, 2)):
+        np.left_shift(packed, shift, out=temp)
+        np.right_shift(temp, 22, out=temp)
+        np.left_shift(temp, exponent, out=temp)
+        out[:, axis] = temp
+    return out
+
+@lru_cache(maxsize=8192)
 def _timestamp_string(timestamp):
-    """Formatted version of timestamp"""
+    """Formatted version of timestamp (cached, as the same timestamps are formatted repeatedly)"""
     if timestamp == 0:
         return "0"
     if timestamp < 0:
@@ -96,35 +135,8 @@ def _timestamp_string(timestamp):
 
 
 def _urldecode(input):
-    """URL-decode metadata"""
-    output = bytearray()
-    nibbles = 0
-    value = 0
-    # Each input character
-    for char in input:
-        if char == '%':
-            # Begin a percent-encoded hex pair
-            nibbles = 2
-            value = 0
-        elif nibbles > 0:
-            # Parse the percent-encoded hex digits
-            value *= 16
-            if char >= 'a' and char <= 'f':
-                value += ord(char) + 10 - ord('a')
-            elif char >= 'A' and char <= 'F':
-                value += ord(char) + 10 - ord('A')
-            elif char >= '0' and char <= '9':
-                value += ord(char) - ord('0')
-            nibbles -= 1
-            if nibbles == 0:
-                output.append(value)
-        elif char == '+':
-            # Treat plus as space (application/x-www-form-urlencoded)
-            output.append(ord(' '))
-        else:
-            # Preserve character
-            output.append(ord(char))
-    return output.decode('utf-8')
+    """URL-decode metadata (percent-encoded UTF-8, with plus as space as application/x-www-form-urlencoded)"""
+    return unquote_plus(input, encoding='utf-8')
 
 
 def _cwa_parse_metadata(data):
@@ -247,173 +259,257 @@ def _parse_cwa_header(block):
     return header
 
 
-def _parse_cwa_data(block, extractData=False):
-    """(Slow) parser for a single block."""
+# Data type for numpy loading of whole sectors
+_CWA_SECTOR_DTYPE = np.dtype([
+    ('packet_header', '<H'),                # @ 0  +2   ASCII "AX", little-endian (0x5841)
+    ('packet_length', '<H'),                # @ 2  +2   Packet length (508 bytes, with header (4) = 512 bytes total)
+    ('device_fractional', '<H'),            # @ 4  +2   Top bit set: 15-bit fraction of a second for the time stamp, the timestampOffset was already adjusted to minimize this assuming ideal sample rate; Top bit clear: 15-bit device identifier, 0 = unknown;
+    ('session_id', '<I'),                   # @ 6  +4   Unique session identifier, 0 = unknown
+    ('sequence_id', '<I'),                  # @10  +4   Sequence counter (0-indexed), each packet has a new number (reset if restarted)
+    ('timestamp_packed', '<I'),             # @14  +4   Last reported RTC value, 0 = unknown
+    ('scale_light', '<H'),                  # @18  +2   Scaling info, and lower 10-bits are the last recorded light sensor value in raw units, 0 = none #  log10LuxTimes10Power3 = ((value + 512.0) * 6000 / 1024); lux = pow(10.0, log10LuxTimes10Power3 / 1000.0);
+    ('temperature', '<H'),                  # @20  +2   Last recorded temperature sensor value in raw units, 0 = none
+    ('events', 'B'),                        # @22  +1   Event flags since last packet, b0 = resume logging, b1 = reserved for single-tap event, b2 = reserved for double-tap event, b3 = reserved, b4 = reserved for diagnostic hardware buffer, b5 = reserved for diagnostic software buffer, b6 = reserved for diagnostic internal flag, b7 = reserved)
+    ('battery', 'B'),                       # @23  +1   Last recorded battery level in raw units, 0 = unknown
+    ('rate_code', 'B'),                     # @24  +1   Sample rate code, frequency (3200/(1<<(15-(rate & 0x0f)))) Hz, range (+/-g) (16 >> (rate >> 6)).
+    ('num_axes_bps', 'B'),                  # @25  +1   0x32 (top nibble: number of axes = 3; bottom nibble: packing format - 2 = 3x 16-bit signed, 0 = 3x 10-bit signed + 2-bit exponent)
+    ('timestamp_offset', '<h'),             # @26  +2   Relative sample index from the start of the buffer where the whole-second timestamp is valid
+    ('sample_count', '<H'),                 # @28  +2   Number of accelerometer samples (depending on packing, 40/80/120 if this sector is full)
+    ('raw_i16', '<i2', (240,)),             # @30  +480 Raw sample data (as 16-bit values, see _raw_u32() for packed DWORDs).  Each sample is either 3x 16-bit signed values (x, y, z) or one 32-bit packed value (The bits in bytes [3][2][1][0]: eezzzzzz zzzzyyyy yyyyyyxx xxxxxxxx, e = binary exponent, lsb on right)
+    ('checksum', '<H'),                     # @510 +2   Checksum of packet (16-bit word-wise sum of the whole packet should be zero)
+])
+
+
+def _cwa_data_format(record, include_strings=False):
+    """Data format and sector values from a single sector record (of _CWA_SECTOR_DTYPE), empty if the sector is not valid.  Formatted strings (timestampTime) only if include_strings."""
     data = {}
-    if len(block) >= 512:
-        packetHeader = unpack('BB', block[0:2])                       # @ 0  +2   ASCII "AX", little-endian (0x5841)
-        packetLength = unpack('<H', block[2:4])[0]                    # @ 2  +2   Packet length (508 bytes, with header (4) = 512 bytes total)
-        if packetHeader[0] == ord('A') and packetHeader[1] == ord('X') and packetLength == 508 and _checksum(block[0:512]) == 0:
-            #checksum = unpack('<H', block[510:512])[0]               # @510 +2   Checksum of packet (16-bit word-wise sum of the whole packet should be zero)
-
-            deviceFractional = unpack('<H', block[4:6])[0]            # @ 4  +2   Top bit set: 15-bit fraction of a second for the time stamp, the timestampOffset was already adjusted to minimize this assuming ideal sample rate; Top bit clear: 15-bit device identifier, 0 = unknown;
-            data['deviceFractional'] = deviceFractional
-            data['sessionId'] = unpack('<I', block[6:10])[0]          # @ 6  +4   Unique session identifier, 0 = unknown
-            data['sequenceId'] = unpack('<I', block[10:14])[0]        # @10  +4   Sequence counter (0-indexed), each packet has a new number (reset if restarted)
-            timestamp = _parse_timestamp(unpack('<I', block[14:18])[0]) # @14  +4   Last reported RTC value, 0 = unknown
-            light = unpack('<H', block[18:20])[0]                     # @18  +2   Lower 10 bits are the last recorded light sensor value in raw units, 0 = none #  log10LuxTimes10Power3 = ((value + 512.0) * 6000 / 1024); lux = pow(10.0, log10LuxTimes10Power3 / 1000.0);
-            data['light'] = light & 0x3ff  # least-significant 10 bits
-            temperature = unpack('<H', block[20:22])[0]               # @20  +2   Last recorded temperature sensor value in raw units, 0 = none
-            data['temperature'] = temperature * 75.0 / 256 - 50
-            data['events'] = unpack('B', block[22:23])[0]             # @22  +1   Event flags since last packet, b0 = resume logging, b1 = reserved for single-tap event, b2 = reserved for double-tap event, b3 = reserved, b4 = reserved for diagnostic hardware buffer, b5 = reserved for diagnostic software buffer, b6 = reserved for diagnostic internal flag, b7 = reserved)
-            battery = unpack('B', block[23:24])[0]                    # @23  +1   Last recorded battery level in raw units, 0 = unknown
-            data['battery'] = (battery + 512.0) * 6000 / 1024 / 1000.0
-            rateCode = unpack('B', block[24:25])[0]                   # @24  +1   Sample rate code, frequency (3200/(1<<(15-(rate & 0x0f)))) Hz, range (+/-g) (16 >> (rate >> 6)).
-            data['rateCode'] = rateCode
-            numAxesBPS = unpack('B', block[25:26])[0]                 # @25  +1   0x32 (top nibble: number of axes = 3; bottom nibble: packing format - 2 = 3x 16-bit signed, 0 = 3x 10-bit signed + 2-bit exponent)
-            data['numAxesBPS'] = numAxesBPS
-            timestampOffset = unpack('<h', block[26:28])[0]           # @26  +2   Relative sample index from the start of the buffer where the whole-second timestamp is valid
-            data['sampleCount'] = unpack('<H', block[28:30])[0]       # @28  +2   Number of accelerometer samples (40/80/120, depending on format, if this sector is full)
-            # rawSampleData[480] = block[30:510]                      # @30  +480 Raw sample data.  Each sample is either 3x 16-bit signed values (x, y, z) or one 32-bit packed value (The bits in bytes [3][2][1][0]: eezzzzzz zzzzyyyy yyyyyyxx xxxxxxxx, e = binary exponent, lsb on right)
-            
-            # range = 16 >> (rateCode >> 6)  ## Nearest configured frequency: 3200 / (2 ^ round(log2(3200 / frequency)))
-            if rateCode == 0x00:             # Very old format used timestampOffset to indicate sample rate
-                frequency = timestampOffset
-            else:
-                frequency = 3200 / (1 << (15 - (rateCode & 0x0f)))
-            data['frequency'] = frequency
-            
-            timeFractional = 0;
-            # if top-bit set, we have a fractional date
-            if deviceFractional & 0x8000:
-                # Need to undo backwards-compatible shim by calculating how many whole samples the fractional part of timestamp accounts for.
-                timeFractional = (deviceFractional & 0x7fff) << 1     # use original deviceId field bottom 15-bits as 16-bit fractional time
-                timestampOffset += (timeFractional * int(frequency)) >> 16 # undo the backwards-compatible shift (as we have a true fractional)
-            
-            # Add fractional time to timestamp
-            timestamp += timeFractional / 65536
+    if record['packet_header'] == 22593 and record['packet_length'] == 508 and _checksum(record.tobytes()) == 0:    # "AX", 508 bytes, word-wise sum is zero
+        deviceFractional = int(record['device_fractional'])           # @ 4  +2   Top bit set: 15-bit fraction of a second for the time stamp, the timestampOffset was already adjusted to minimize this assuming ideal sample rate; Top bit clear: 15-bit device identifier, 0 = unknown;
+        data['deviceFractional'] = deviceFractional
+        data['sessionId'] = int(record['session_id'])                 # @ 6  +4   Unique session identifier, 0 = unknown
+        data['sequenceId'] = int(record['sequence_id'])               # @10  +4   Sequence counter (0-indexed), each packet has a new number (reset if restarted)
+        timestamp = _parse_timestamp(int(record['timestamp_packed'])) # @14  +4   Last reported RTC value, 0 = unknown
+        light = int(record['scale_light'])                            # @18  +2   Lower 10 bits are the last recorded light sensor value in raw units, 0 = none #  log10LuxTimes10Power3 = ((value + 512.0) * 6000 / 1024); lux = pow(10.0, log10LuxTimes10Power3 / 1000.0);
+        data['light'] = light & 0x3ff  # least-significant 10 bits
+        temperature = int(record['temperature'])                      # @20  +2   Last recorded temperature sensor value in raw units, 0 = none
+        data['temperature'] = temperature * 75.0 / 256 - 50
+        data['events'] = int(record['events'])                        # @22  +1   Event flags since last packet, b0 = resume logging, b1 = reserved for single-tap event, b2 = reserved for double-tap event, b3 = reserved, b4 = reserved for diagnostic hardware buffer, b5 = reserved for diagnostic software buffer, b6 = reserved for diagnostic internal flag, b7 = reserved)
+        battery = int(record['battery'])                              # @23  +1   Last recorded battery level in raw units, 0 = unknown
+        data['battery'] = (battery + 512.0) * 6000 / 1024 / 1000.0
+        rateCode = int(record['rate_code'])                           # @24  +1   Sample rate code, frequency (3200/(1<<(15-(rate & 0x0f)))) Hz, range (+/-g) (16 >> (rate >> 6)).
+        data['rateCode'] = rateCode
+        numAxesBPS = int(record['num_axes_bps'])                      # @25  +1   0x32 (top nibble: number of axes = 3; bottom nibble: packing format - 2 = 3x 16-bit signed, 0 = 3x 10-bit signed + 2-bit exponent)
+        data['numAxesBPS'] = numAxesBPS
+        timestampOffset = int(record['timestamp_offset'])             # @26  +2   Relative sample index from the start of the buffer where the whole-second timestamp is valid
+        data['sampleCount'] = int(record['sample_count'])             # @28  +2   Number of accelerometer samples (40/80/120, depending on format, if this sector is full)
+        # raw_i16                                                     # @30  +480 Raw sample data.  Each sample is either 3x 16-bit signed values (x, y, z) or one 32-bit packed value (The bits in bytes [3][2][1][0]: eezzzzzz zzzzyyyy yyyyyyxx xxxxxxxx, e = binary exponent, lsb on right)
+        
+        # range = 16 >> (rateCode >> 6)  ## Nearest configured frequency: 3200 / (2 ^ round(log2(3200 / frequency)))
+        if rateCode == 0x00:             # Very old format used timestampOffset to indicate sample rate
+            frequency = timestampOffset
+        else:
+            frequency = 3200 / (1 << (15 - (rateCode & 0x0f)))
+        data['frequency'] = frequency
+        
+        timeFractional = 0;
+        # if top-bit set, we have a fractional date
+        if deviceFractional & 0x8000:
+            # Need to undo backwards-compatible shim by calculating how many whole samples the fractional part of timestamp accounts for.
+            timeFractional = (deviceFractional & 0x7fff) << 1     # use original deviceId field bottom 15-bits as 16-bit fractional time
+            timestampOffset += (timeFractional * int(frequency)) >> 16 # undo the backwards-compatible shift (as we have a true fractional)
+        
+        # Add fractional time to timestamp
+        timestamp += timeFractional / 65536
 
-            data['timestamp'] = timestamp
-            data['timestampOffset'] = timestampOffset
-            
+        data['timestamp'] = timestamp
+        data['timestampOffset'] = timestampOffset
+        
+        if include_strings:
             data['timestampTime'] = _timestamp_string(data['timestamp'])
 
-            # Maximum samples per sector
-            channels = (numAxesBPS >> 4) & 0x0f
-            bytesPerAxis = numAxesBPS & 0x0f
+        # Maximum samples per sector
+        channels = (numAxesBPS >> 4) & 0x0f
+        bytesPerAxis = numAxesBPS & 0x0f
+        bytesPerSample = 4
+        if bytesPerAxis == 0 and channels == 3:
             bytesPerSample = 4
-            if bytesPerAxis == 0 and channels == 3:
-                bytesPerSample = 4
-            elif bytesPerAxis > 0 and channels > 0:
-                bytesPerSample = bytesPerAxis * channels
-            samplesPerSector = 480 // bytesPerSample
-            data['channels'] = channels
-            data['bytesPerAxis'] = bytesPerAxis            # 0 for DWORD packing
-            data['bytesPerSample'] = bytesPerSample
-            data['samplesPerSector'] = samplesPerSector
-
-            # Estimate the time of the first/after-last sample (if at the configured rate)
-            data['estimatedFirstSampleTime'] = timestamp - (timestampOffset / frequency)
-            data['estimatedAfterLastSampleTime'] = data['estimatedFirstSampleTime'] + (samplesPerSector / frequency)
-            
-            # Axes
-            accelAxis = -1
-            gyroAxis = -1
-            magAxis = -1
-            if channels >= 6:
-                gyroAxis = 0
-                accelAxis = 3
-                if channels >= 9:
-                    magAxis = 6
-            elif channels >= 3:
-                accelAxis = 0
-            
-            # Default units/scaling/range
-            accelUnit = 256        # 1g = 256
-            gyroRange = 2000    # 32768 = 2000dps
-            magUnit = 16        # 1uT = 16
-            # light is least significant 10 bits, accel scale 3-MSB, gyro scale next 3 bits: AAAGGGLLLLLLLLLL
-            accelUnit = 1 << (8 + ((light >> 13) & 0x07))
-            if ((light >> 10) & 0x07) != 0:
-                gyroRange = 8000 // (1 << ((light >> 10) & 0x07))
-            
-            # Scale
-            #accelScale = 1.0 / accelUnit
-            #gyroScale = float(gyroRange) / 32768
-            #magScale = 1.0 / magUnit
-
-            # Range
-            accelRange = 16
-            if rateCode != 0:
-                accelRange = 16 >> (rateCode >> 6)
-            magRange = 32768 / magUnit
-            
-            # Unit
-            gyroUnit = 32768.0 / gyroRange
-
-            if accelAxis >= 0:
-                data['accelAxis'] = accelAxis
-                data['accelRange'] = accelRange
-                data['accelUnit'] = accelUnit
-            if gyroAxis >= 0:
-                data['gyroAxis'] = gyroAxis
-                data['gyroRange'] = gyroRange
-                data['gyroUnit'] = gyroUnit
-            if magAxis >= 0:
-                data['magAxis'] = magAxis
-                data['magRange'] = magRange
-                data['magUnit'] = magUnit
-            
-            # Read sample values
+        elif bytesPerAxis > 0 and channels > 0:
+            bytesPerSample = bytesPerAxis * channels
+        samplesPerSector = 480 // bytesPerSample
+        data['channels'] = channels
+        data['bytesPerAxis'] = bytesPerAxis            # 0 for DWORD packing
+        data['bytesPerSample'] = bytesPerSample
+        data['samplesPerSector'] = samplesPerSector
+
+        # Estimate the time of the first/after-last sample (if at the configured rate)
+        data['estimatedFirstSampleTime'] = timestamp - (timestampOffset / frequency)
+        data['estimatedAfterLastSampleTime'] = data['estimatedFirstSampleTime'] + (samplesPerSector / frequency)
+        
+        # Axes
+        accelAxis = -1
+        gyroAxis = -1
+        magAxis = -1
+        if channels >= 6:
+            gyroAxis = 0
+            accelAxis = 3
+            if channels >= 9:
+                magAxis = 6
+        elif channels >= 3:
+            accelAxis = 0
+        
+        # Default units/scaling/range
+        accelUnit = 256        # 1g = 256
+        gyroRange = 2000    # 32768 = 2000dps
+        magUnit = 16        # 1uT = 16
+        # light is least significant 10 bits, accel scale 3-MSB, gyro scale next 3 bits: AAAGGGLLLLLLLLLL
+        accelUnit = 1 << (8 + ((light >> 13) & 0x07))
+        if ((light >> 10) & 0x07) != 0:
+            gyroRange = 8000 // (1 << ((light >> 10) & 0x07))
+        
+        # Scale
+        #accelScale = 1.0 / accelUnit
+        #gyroScale = float(gyroRange) / 32768
+        #magScale = 1.0 / magUnit
+
+        # Range
+        accelRange = 16
+        if rateCode != 0:
+            accelRange = 16 >> (rateCode >> 6)
+        magRange = 32768 / magUnit
+        
+        # Unit
+        gyroUnit = 32768.0 / gyroRange
+
+        if accelAxis >= 0:
+            data['accelAxis'] = accelAxis
+            data['accelRange'] = accelRange
+            data['accelUnit'] = accelUnit
+        if gyroAxis >= 0:
+            data['gyroAxis'] = gyroAxis
+            data['gyroRange'] = gyroRange
+            data['gyroUnit'] = gyroUnit
+        if magAxis >= 0:
+            data['magAxis'] = magAxis
+            data['magRange'] = magRange
+            data['magUnit'] = magUnit
+
+    return data
+
+
+def _parse_cwa_data(block, extractData=False, include_strings=False):
+    """(Slow) parser for a single block (formatted strings, e.g. timestampTime, are only included if include_strings)."""
+    data = {}
+    if len(block) >= 512:
+        record = np.frombuffer(block, dtype=_CWA_SECTOR_DTYPE, count=1)[0]
+        data = _cwa_data_format(record, include_strings)
+        if 'channels' in data:
+            channels = data['channels']
+            bytesPerAxis = data['bytesPerAxis']
+            accelAxis = data.get('accelAxis', -1)
+            gyroAxis = data.get('gyroAxis', -1)
+            magAxis = data.get('magAxis', -1)
+            accelUnit = data.get('accelUnit')
+            gyroUnit = data.get('gyroUnit')
+            magUnit = data.get('magUnit')
+
+            # Read sample values (in to preallocated (samples, 3) float32 arrays)
             if extractData:
+                count = min(data['sampleCount'], data['samplesPerSector'])
+                samples = np.empty((0, channels), dtype=np.int16)
+                if bytesPerAxis == 2:
+                    # Signed 16-bit little-endian values, one row per sample
+                    samples = record['raw_i16'][:count * channels].reshape(-1, channels)
+                elif bytesPerAxis == 0 and channels == 3:
+                    values = _raw_u32(record['raw_i16'])[:count]
+                    samples = _unpack_dword_batch(values, np.empty(shape=(count, 3), dtype=np.int16))
+
                 if accelAxis >= 0:
-                    accelSamples = [[0, 0, 0]] * data['sampleCount']
-                    if bytesPerAxis == 0 and channels == 3:
-                        for i in range(data['sampleCount']):
-                            ofs = 30 + i * 4
-                            #value =  block[i] | (block[i + 1] << 8) | (block[i + 2] << 16) | (block[i + 3] << 24)
-                            value = unpack('<I', block[ofs:ofs + 4])[0]
-                            axes = _dword_unpack(value)
-                            accelSamples[i][0] = axes[0] / accelUnit
-                            accelSamples[i][1] = axes[1] / accelUnit
-                            accelSamples[i][2] = axes[2] / accelUnit
-                    elif bytesPerAxis == 2:
-                        for i in range(data['sampleCount']):
-                            ofs = 30 + (i * 2 * channels) + 2 * accelAxis
-                            accelSamples[i][0] = (block[ofs + 0] | (block[ofs + 1] << 8)) / accelUnit
-                            accelSamples[i][1] = (block[ofs + 2] | (block[ofs + 3] << 8)) / accelUnit
-                            accelSamples[i][2] = (block[ofs + 4] | (block[ofs + 5] << 8)) / accelUnit
+                    accelSamples = np.empty((samples.shape[0], 3), dtype=np.float32)
+                    np.multiply(samples[:, accelAxis:accelAxis + 3], 1.0 / accelUnit, out=accelSamples, casting='unsafe')
                     data['samplesAccel'] = accelSamples
                 
                 if gyroAxis >= 0 and bytesPerAxis == 2:
-                    gyroSamples = [[0, 0, 0]] * data['sampleCount']
-                    for i in range(data['sampleCount']):
-                        ofs = 30 + (i * 2 * channels) + 2 * gyroAxis
-                        gyroSamples[i][0] = (block[ofs + 0] | (block[ofs + 1] << 8)) / gyroUnit
-                        gyroSamples[i][1] = (block[ofs + 2] | (block[ofs + 3] << 8)) / gyroUnit
-                        gyroSamples[i][2] = (block[ofs + 4] | (block[ofs + 5] << 8)) / gyroUnit
+                    gyroSamples = np.empty((count, 3), dtype=np.float32)
+                    np.multiply(samples[:, gyroAxis:gyroAxis + 3], 1.0 / gyroUnit, out=gyroSamples, casting='unsafe')
                     data['samplesGyro'] = gyroSamples
                 
                 if magAxis >= 0 and bytesPerAxis == 2:
-                    magSamples = [[0, 0, 0]] * data['sampleCount']
-                    for i in range(data['sampleCount']):
-                        ofs = 30 + (i * 2 * channels) + 2 * magAxis
-                        magSamples[i][0] = (block[ofs + 0] | (block[ofs + 1] << 8)) / magUnit
-                        magSamples[i][1] = (block[ofs + 2] | (block[ofs + 3] << 8)) / magUnit
-                        magSamples[i][2] = (block[ofs + 4] | (block[ofs + 5] << 8)) / magUnit
+                    magSamples = np.empty((count, 3), dtype=np.float32)
+                    np.multiply(samples[:, magAxis:magAxis + 3], 1.0 / magUnit, out=magSamples, casting='unsafe')
                     data['samplesMag'] = magSamples
 
 
     return data
 
 
+def _interp_sectors(series, samples_per_sector, outs):
+    """Linear interpolation of per-sector series to each sample, as np.interp() over the sector start samples (holding the last value), written in to the output columns."""
+    # Offset of each sample within its sector, shared by all of the series
+    sample_offset = np.arange(samples_per_sector, dtype=np.float64)
+    for values, out in zip(series, outs):
+        values = np.asarray(values, dtype=np.float64)
+        # Per-sector slope towards the next sector's value (zero after the last sector, so that it is held)
+        slope = np.zeros(len(values), dtype=np.float64)
+        np.divide(np.diff(values), samples_per_sector, out=slope[:-1])
+        # (sector, sample) view of the output column, so the values are computed in place without temporaries
+        out = out.reshape(-1, samples_per_sector)
+        np.multiply(slope[:, np.newaxis], sample_offset, out=out)
+        np.add(out, values[:, np.newaxis], out=out)
+
+
+def _raw_u32(raw_i16):
+    """Zero-copy view of the raw sample data field (..., 240) int16 as (..., 120) packed DWORDs."""
+    return raw_i16.view(np.dtype('<u4'))
+
+
+# Number of sectors decoded per block (120 samples each): bounds the size of the temporaries to a cache-friendly size
+_UNPACK_BLOCK_SECTORS = 4096
+
+# Number of threads used to decode and scale the blocks of sectors (a few, as the work is mostly memory-bound)
+_SCALE_WORKERS = min(4, os.cpu_count() or 1)
+
+def _unpack_dword_samples(np_data, channels):
+    """Decode all DWORD-packed triaxial samples (3x 10-bit signed + 2-bit exponent) from the structured sector data"""
+    # Zero-copy 2D (sector, sample) uint32 view of the whole file's packed DWORDs, unpacked in to a preallocated (sector, sample, axis) output
+    dword_view = _raw_u32(np_data['raw_i16'])
+    raw_samples = np.empty(shape=dword_view.shape + (3,), dtype=np.int16)
+    # Stream through the sectors in blocks, so the intermediate arrays stay small rather than several full-file temporaries
+    for start in range(0, dword_view.shape[0], _UNPACK_BLOCK_SECTORS):
+        end = min(start + _UNPACK_BLOCK_SECTORS, dword_view.shape[0])
+        _unpack_dword_batch(dword_view[start:end], raw_samples[start:end].reshape(-1, 3))
+    return raw_samples
+
+
+def _unpack_word_samples(np_data, channels):
+    """Decode all 16-bit signed samples of the given number of channels from the structured sector data"""
+    # Zero-copy 3D (sector, sample, channel) view of the whole file's signed 16-bit values
+    # (not flattened to one row per sample, as the sectors are not contiguous so that would copy all of the values)
+    samples_per_sector = 480 // (2 * channels)
+    return np_data['raw_i16'][:, :samples_per_sector * channels].reshape(-1, samples_per_sector, channels)
+
+
+# Sample decoder for each data format, by (channels, bytesPerAxis) -- the format is fixed for all valid sectors
+# (each returns the raw values as a (sector, sample, channel) array)
+_SAMPLE_DECODERS = {
+    (3, 0): _unpack_dword_samples,      # AX3 packed accelerometer
+    (3, 2): _unpack_word_samples,       # AX3 unpacked accelerometer
+    (6, 2): _unpack_word_samples,       # AX6 gyroscope and accelerometer
+    (9, 2): _unpack_word_samples,       # gyroscope, accelerometer and magnetometer
+}
 
 
 class CwaData(BaseData):
     """
     CWA file loader
+
+    Separate instances share no mutable state, and the bulk decoding is in NumPy operations that release the GIL, 
+    so several files can be loaded concurrently from a thread pool (one instance per thread).
     """
 
+    # Cleanup is by the weakref finalizer registered when the file is opened (see close()), rather than BaseData's __del__
+    def __del__(self):
+        pass
+
     def _parse_header(self):
         if self.verbose: print('Parsing header...', flush=True)
         self.header = _parse_cwa_header(self.full_buffer)
@@ -424,66 +520,71 @@ class CwaData(BaseData):
         else:
             raise Exception('File header parsing error')
 
-        # Parse first sector to get initial data format
+        # First sector, as a record of the same structured type used for all of the data, gives the initial data format
         self.data_format = {}
         if (len(self.full_buffer) - self.data_offset >= SECTOR_SIZE):
-            self.data_format = _parse_cwa_data(self.full_buffer[self.data_offset:self.data_offset + SECTOR_SIZE])
+            first_sector = np.frombuffer(self.full_buffer[self.data_offset:self.data_offset + SECTOR_SIZE], dtype=_CWA_SECTOR_DTYPE, count=1)[0]
+            self.data_format = _cwa_data_format(first_sector, include_strings=True)
             if 'channels' not in self.data_format or self.data_format['channels'] < 1 or 'samplesPerSector' not in self.data_format or self.data_format['samplesPerSector'] <= 0:
                 raise Exception('Unexpected data format')
         else:
             raise Exception('File has no data')
 
+        # Bind the specialized sample decoder for this file's data format once (None if unhandled, reported when the samples are read)
+        self._extract = _SAMPLE_DECODERS.get((self.data_format['channels'], self.data_format['bytesPerAxis']))
+
 
     def _parse_data(self):
         report = {}
         if self.verbose: print('Interpreting data...', flush=True)
-        self.data_buffer = self.full_buffer[self.data_offset:]
-
-        # Data type for numpy loading
-        dt_cwa = np.dtype([
-            ('packet_header', '<H'),                # @ 0  +2   ASCII "AX", little-endian (0x5841)
-            ('packet_length', '<H'),                # @ 2  +2   Packet length (508 bytes, with header (4) = 512 bytes total)
-            ('device_fractional', '<H'),            # @ 4  +2   Top bit set: 15-bit fraction of a second for the time stamp, the timestampOffset was already adjusted to minimize this assuming ideal sample rate; Top bit clear: 15-bit device identifier, 0 = unknown;
-            ('session_id', '<I'),                   # @ 6  +4   Unique session identifier, 0 = unknown
-            ('sequence_id', '<I'),                  # @10  +4   Sequence counter (0-indexed), each packet has a new number (reset if restarted)
-            ('timestamp_packed', '<I'),             # @14  +4   Last reported RTC value, 0 = unknown
-            ('scale_light', '<H'),                  # @18  +2   Scaling info, and lower 10-bits are the last recorded light sensor value in raw units, 0 = none #  log10LuxTimes10Power3 = ((value + 512.0) * 6000 / 1024); lux = pow(10.0, log10LuxTimes10Power3 / 1000.0);
-            ('temperature', '<H'),                  # @20  +2   Last recorded temperature sensor value in raw units, 0 = none
-            ('events', 'B'),                        # @22  +1   Event flags since last packet, b0 = resume logging, b1 = reserved for single-tap event, b2 = reserved for double-tap event, b3 = reserved, b4 = reserved for diagnostic hardware buffer, b5 = reserved for diagnostic software buffer, b6 = reserved for diagnostic internal flag, b7 = reserved)
-            ('battery', 'B'),                       # @23  +1   Last recorded battery level in raw units, 0 = unknown
-            ('rate_code', 'B'),                     # @24  +1   Sample rate code, frequency (3200/(1<<(15-(rate & 0x0f)))) Hz, range (+/-g) (16 >> (rate >> 6)).
-            ('num_axes_bps', 'B'),                  # @25  +1   0x32 (top nibble: number of axes = 3; bottom nibble: packing format - 2 = 3x 16-bit signed, 0 = 3x 10-bit signed + 2-bit exponent)
-            ('timestamp_offset', '<h'),             # @26  +2   Relative sample index from the start of the buffer where the whole-second timestamp is valid
-            ('sample_count', '<H'),                 # @28  +2   Number of accelerometer samples (depending on packing, 40/80/120 if this sector is full)
-            ('raw_data_buffer', np.dtype('V480')),  # @30  +480 Raw sample data.  Each sample is either 3x 16-bit signed values (x, y, z) or one 32-bit packed value (The bits in bytes [3][2][1][0]: eezzzzzz zzzzyyyy yyyyyyxx xxxxxxxx, e = binary exponent, lsb on right)
-            ('checksum', '<H'),                     # @510 +2   Checksum of packet (16-bit word-wise sum of the whole packet should be zero)
-        ])
+        # Zero-copy view of the whole data sectors (slicing a mmap() would copy the whole file), released on close()
+        data_length = ((len(self.full_buffer) - self.data_offset) // SECTOR_SIZE) * SECTOR_SIZE
+        report['trailing_bytes'] = len(self.full_buffer) - self.data_offset - data_length
+        if report['trailing_bytes'] != 0:
+            print('WARNING: Ignoring ' + str(report['trailing_bytes']) + ' byte(s) of partial sector at end of file', flush=True)
+        self.data_buffer = memoryview(self.full_buffer)[self.data_offset:self.data_offset + data_length]
+        self._views.append(self.data_buffer)
 
         if self.verbose: print('From buffer...', flush=True)
-        self.np_data = np.frombuffer(self.data_buffer, dtype=dt_cwa, count=-1)
+        self.np_data = np.frombuffer(self.data_buffer, dtype=_CWA_SECTOR_DTYPE, count=-1)
 
-        if self.verbose: print('Creating data frame...', flush=True)
-        self.df = pd.DataFrame(self.np_data)
-
-        #self.df.index.name = 'row_index'
+        # Per-sector columns as arrays (a DataFrame is only built if the .df property is used): only the fields that are used,
+        # as zero-copy views of the structured data (not the raw sample data, which is decoded directly from the buffer, or the stored checksum)
+        if self.verbose: print('Creating columns...', flush=True)
+        self.cols = {name: self.np_data[name] for name in ('packet_header', 'packet_length', 'device_fractional', 'session_id', 'sequence_id', 'timestamp_packed', 'scale_light', 'temperature', 'events', 'battery', 'rate_code', 'num_axes_bps', 'timestamp_offset', 'sample_count')}
+        num_sectors = self.np_data.shape[0]
 
         if self.verbose: print('Adding sector index...', flush=True)
-        self.df['sector_index'] = np.arange(0, self.df.shape[0])
-
-        if self.verbose: print('Adding sample index...', flush=True)
-        self.df['sample_index'] = self.df['sector_index'] * self.data_format['sampleCount']
+        self.cols['sector_index'] = np.arange(0, num_sectors)
 
         # Calculate sectors checksums: view data as 16-bit LE integers, reshaped per 512-byte sector, summed (wrapped to zero)
         if self.verbose: print('Calculating checksums...', flush=True)
-        np_words = np.frombuffer(self.data_buffer, dtype=np.dtype('<H'), count=-1)
-        np_sector_words = np.reshape(np_words, (-1, SECTOR_SIZE // 2))
-        self.df['checksum_sum'] = np.sum(np_sector_words, dtype=np.int16, axis=1)
+        np_sector_words = np.frombuffer(self.data_buffer, dtype=np.dtype('<H'), count=-1).reshape(-1, SECTOR_SIZE // 2)
+        # (accumulated directly in wrapping unsigned 16-bit lanes, no widening or sign conversion -- this reduction is memory-bound,
+        #  and summing wider uint64 lanes with shifts/masks costs several extra passes over the data)
+        self.cols['checksum_sum'] = np.add.reduce(np_sector_words, axis=1, dtype=np.uint16)
 
         # Valid sectors: zero checksum, correct header and packet-length, matching initial data format (numAxesBPS and rateCode)
         if self.verbose: print('Determining valid sectors...', flush=True)
-        self.df['valid_sector'] = ((self.df.checksum_sum == 0) & (self.df.packet_header == 22593) & (self.df.packet_length == 508) & (self.df.num_axes_bps == self.data_format['numAxesBPS']) & (self.df.rate_code == self.data_format['rateCode']))
-        report['sector_count'] = self.df.shape[0]
-        report['valid_sector_count'] = self.df.valid_sector.sum()
+        # (accumulated in to one boolean array via a single scratch array, rather than a new temporary for each condition and combination)
+        cols = self.cols
+        valid_sector = np.empty(num_sectors, dtype=bool)
+        condition = np.empty(num_sectors, dtype=bool)
+        np.equal(cols['checksum_sum'], 0, out=valid_sector)
+        for name, value in (('packet_header', 22593), ('packet_length', 508), ('num_axes_bps', self.data_format['numAxesBPS']), ('rate_code', self.data_format['rateCode'])):
+            np.equal(cols[name], value, out=condition)
+            valid_sector &= condition
+        del condition
+        cols['valid_sector'] = valid_sector
+
+        # Per-sector scaling from the packed scale/light field (AAAGGGLLLLLLLLLL), so that any changes within a file are applied to each sector
+        scale_light = cols['scale_light']
+        cols['light'] = scale_light & 0x3ff
+        cols['accel_unit'] = np.left_shift(1, 8 + ((scale_light >> 13) & 0x07).astype(np.int32))
+        gyro_code = ((scale_light >> 10) & 0x07).astype(np.int32)
+        cols['gyro_range'] = np.where(gyro_code == 0, 2000, 8000 // np.left_shift(1, gyro_code))
+        report['sector_count'] = num_sectors
+        report['valid_sector_count'] = int(np.count_nonzero(cols['valid_sector']))
         report['invalid_sector_count'] = report['sector_count'] - report['valid_sector_count']
         if self.verbose: print('Invalid sectors: ' + str(report['invalid_sector_count']) + ' (Valid: '  + str(report['valid_sector_count']) + ' / ' + str(report['sector_count']) + ')', flush=True)
 
@@ -492,101 +593,98 @@ class CwaData(BaseData):
 
     def _parse_times(self):
         if self.verbose: print('Parsing timestamps...', flush=True)
-        #self.df['timestamp'] = self.df['timestamp_packed'].apply(lambda timestamp_packed: _fast_timestamp(timestamp_packed))
-        _fast_timestamp_vectorized = np.vectorize(_fast_timestamp, otypes=[np.uint32])
-        self.df['timestamp'] = _fast_timestamp_vectorized(self.df['timestamp_packed'])
+        # The whole column at once: shifts/masks and a single table look-up
+        timestamp = _fast_timestamp(self.cols['timestamp_packed'].astype(np.int64))
 
         # Check we have fractional timestamps
         if self.data_format['deviceFractional'] & 0x8000:
             # Need to undo backwards-compatible shim by calculating how many whole samples the fractional part of timestamp accounts for.
             int_frequency = int(self.data_format['frequency'])                          # Configured rate
             if self.verbose: print('Adjusting timestamps for fractional (@' + str(int_frequency) + ' Hz)...', flush=True)
-            time_fractional = (self.df['device_fractional'] & 0x7fff) * 2               # Use bottom 15-bits as a 16-bit fractional time
+            time_fractional = (self.cols['device_fractional'] & 0x7fff) * 2              # Use bottom 15-bits as a 16-bit fractional time
             undo_adjust = (time_fractional.astype(np.int32) * int_frequency) // 65536   # Undo the backwards-compatible shift (as we have a true fractional)
-            self.df['timestamp_offset'] += undo_adjust
+            self.cols['timestamp_offset'] = self.cols['timestamp_offset'] + undo_adjust    # (new array, not modifying the data view)
 
             # Add fractional time to timestamp
-            self.df['timestamp'] += time_fractional / 65536.0
+            self.cols['timestamp'] = timestamp + time_fractional / 65536.0
         else:
             # Old file, no fractional - adjust timestamp to float anyway for consistency
-            self.df['timestamp'] += 0.0
+            self.cols['timestamp'] = timestamp + 0.0
+
+        # Sector date/time, converted in one vectorized operation rather than formatting each sector (use .dt.strftime() for strings)
+        self.cols['timestamp_time'] = pd.to_datetime(self.cols['timestamp'], unit='s').to_numpy()
 
         # Adjusting timestamp offset
         if self.verbose: print('Timestamp index...', flush=True)
-        self.df['timestamp_index'] = self.df['sample_index'] + self.df['timestamp_offset']
+        # (the index of a sector's first sample is not stored, as it is just sector_index * sampleCount)
+        self.cols['timestamp_index'] = self.cols['sector_index'] * self.data_format['sampleCount'] + self.cols['timestamp_offset']
 
 
 
     def _find_segments(self):
         if self.verbose: print('Finding segments...', flush=True)
-        all_segments = []
 
         # Last sector in a segment where the session_id/config changes, or the sequence does not follow on, or the next sector is invalid.
-        ends = np.where((self.df.valid_sector.diff(periods=-1) != 0) | (self.df.session_id.diff(periods=-1) != 0) | (self.df.num_axes_bps.diff(periods=-1)  != 0) | ((-self.df.sequence_id).diff(periods=-1) != 1))[0]
-        
-        previous_fixed_samples = 0
-        previous_true_samples = 0
+        valid_sector = self.cols['valid_sector']
+        session_id = self.cols['session_id']
+        num_axes_bps = self.cols['num_axes_bps']
+        sequence_id = self.cols['sequence_id'].astype(np.int64)
+        boundary = np.ones(valid_sector.shape[0], dtype=bool)    # (the final sector always ends a segment)
+        changed = boundary[:-1]     # (view: each condition is combined in-place rather than with a temporary per '|')
+        np.not_equal(valid_sector[:-1], valid_sector[1:], out=changed)
+        changed |= session_id[:-1] != session_id[1:]
+        changed |= num_axes_bps[:-1] != num_axes_bps[1:]
+        changed |= np.diff(sequence_id) != 1
+        ends = np.flatnonzero(boundary)
+
+        # Segments as rows of (start, stop) sector indexes (stop is exclusive)
+        starts = np.empty_like(ends)
+        starts[:1] = 0
+        starts[1:] = ends[:-1] + 1
+        all_segments = np.column_stack((starts, ends + 1)).astype(np.int64)
+
+        if self.verbose: print('...segments located: ' + str(all_segments.shape[0]), flush=True)
+        if self.diagnostic: print(str(all_segments), flush=True)
 
-        segment_start = 0
-        for end in ends:
-            segment = {}
+        # TODO: Segments not yet used.  Possibly return as raw sample ranges: scale by self.data_format.data['samplesPerSector']  -- Masked array/numpy.compress()/numpy.take()?
+        return all_segments
 
-            # Slice (sector index)
-            segment['slice'] = slice(segment_start, end + 1)
 
-            # First sector of slice
-            ofs = self.data_offset + segment_start * SECTOR_SIZE
-            segment['start'] = _parse_cwa_data(self.full_buffer[ofs:ofs + SECTOR_SIZE])
+    def iter_segments(self):
+        """
+        Iterate over the segments of contiguous, consistently-configured sectors.
 
-            # Last sector of slice
-            ofs = self.data_offset + end * SECTOR_SIZE
-            segment['end'] = _parse_cwa_data(self.full_buffer[ofs:ofs + SECTOR_SIZE])
+        :returns: A slice of sector indexes (rows of the sector data frame) for each segment.
+        """
+        self._ensure_all_data_read()
+        for start, stop in self.all_segments:
+            yield slice(int(start), int(stop))
 
-            # Current implementation assumes format is fixed for all segments
-            segment['index_fixed'] = previous_fixed_samples
-            previous_fixed_samples += (end + 1 - segment_start) * self.data_format['samplesPerSector']
-            segment['count_fixed'] = previous_fixed_samples - segment['index_fixed']
 
-            # Future implementation could allow per-segment format differences
-            segment['index_true'] = previous_true_samples
-            previous_true_samples += (end - segment_start) * segment['start']['samplesPerSector'] + segment['end']['sampleCount']
-            segment['count_true'] = previous_true_samples - segment['index_true']
- 
-            all_segments.append(segment)
-            segment_start = end + 1
+    def _sample_scale(self, sector_units, unit):
+        """Scale (1/unit) to apply to the (sector, sample, axis) values: a scalar when all valid sectors use the initial unit, otherwise per-sector scales."""
+        if np.all(sector_units[self.cols['valid_sector']] == unit):
+            return 1.0 / unit
+        if self.verbose: print('Sample data: unit changes within file, scaling per sector...', flush=True)
+        return (1.0 / sector_units)[:, np.newaxis, np.newaxis]
 
-        if self.verbose: print('...segments located', flush=True)
-        if self.verbose: print(str(all_segments), flush=True)
-        #if self.verbose: print(str(self.df.iloc[all_segments[0]]))
 
-        # TODO: Segments not yet used.  Possibly return as raw sample ranges: scale by self.data_format.data['samplesPerSector']  -- Masked array/numpy.compress()/numpy.take()?
-        return all_segments
+    def _decode_sector_block(self, start, end, sensor_columns, sector_values, accel_raw_sectors):
+        """Decode the samples of a block of sectors and scale each sensor's three raw channels in to its output columns."""
+        # Each sensor is a contiguous group of three raw channels, scaled in one pass in to its output columns
+        # (the output order differs from the raw channel order, so combining the groups would need a gathered copy)
+        raw_samples = self._extract(self.np_data[start:end], self.data_format['channels'])
+        if accel_raw_sectors is not None:
+            accel_raw_sectors[start:end] = raw_samples[..., self.data_format['accelAxis']:self.data_format['accelAxis']+3]
+        for raw_axis, scale, output_axis in sensor_columns:
+            if isinstance(scale, np.ndarray):
+                scale = scale[start:end]
+            np.multiply(raw_samples[..., raw_axis:raw_axis+3], scale, out=sector_values[start:end, :, output_axis:output_axis+3], dtype=self.dtype, casting='unsafe')
 
 
     def _interpret_samples(self):
 
-        # Align data for contiguous reading
-        if self.data_format['channels'] == 3 and self.data_format['bytesPerSample'] == 4:
-            if self.verbose: print('Sample data: unpacking...', flush=True)
-            # Create 2D strided view of all raw sample data packed DWORDs, flatten to a single array (copies), unpack
-            np_dword = np.frombuffer(self.data_buffer[30:len(self.data_buffer)-2], dtype=np.dtype('<I'), count=-1)
-            dword_view = np.lib.stride_tricks.as_strided(np_dword, (120, len(self.data_buffer) // SECTOR_SIZE), (4, SECTOR_SIZE), writeable=False)
-            packed = dword_view.flatten(order='K')
-            exponent = packed >> 30
-            self.raw_samples = np.ndarray(shape=(dword_view.size, 3), dtype=np.int16)
-            self.raw_samples[:,0] = ((((packed      ) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
-            self.raw_samples[:,1] = ((((packed >> 10) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
-            self.raw_samples[:,2] = ((((packed >> 20) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
-            del packed
-            del exponent
-        elif self.data_format['bytesPerAxis'] == 2:
-            if self.verbose: print('Sample data: flattening...', flush=True)
-            # Create 2D strided view of all raw sample data WORDs before flattening and reshaping
-            np_word = np.frombuffer(self.data_buffer[30:len(self.data_buffer)-2], dtype=np.dtype('<h'), count=-1)
-            word_view = np.lib.stride_tricks.as_strided(np_word, (240, len(self.data_buffer) // SECTOR_SIZE), (2, SECTOR_SIZE), writeable=False)
-            self.raw_samples = word_view.flatten(order='K')
-            self.raw_samples = np.reshape(self.raw_samples, (-1, self.data_format['channels']))
-        else:
+        if self._extract is None:
             raise Exception('Unhandled data format')
 
         # Which sensors?
@@ -597,7 +695,7 @@ class CwaData(BaseData):
         # Calculate dimensions
         axis_count = 0  # time
         if self.include_time: axis_count += 1
-        if self.has_accel: axis_count += 3
+        if self.has_accel and self.accel_dtype is None: axis_count += 3
         if self.has_gyro: axis_count += 3
         if self.has_mag: axis_count += 3
         if self.include_light: axis_count += 1
@@ -605,7 +703,13 @@ class CwaData(BaseData):
         self.labels = []
 
         if self.verbose: print('Create output...', flush=True)
-        self.sample_values = np.ndarray(shape=(self.raw_samples.shape[0], axis_count))
+        # (the sensor values are scaled directly in to their columns of this array, converting inside the ufunc, without temporaries)
+        # (sized from the sector count, so the output is allocated before any of the intermediate arrays)
+        sector_count = self.np_data.shape[0]
+        samples_per_sector = self.data_format['samplesPerSector']
+        self.sample_values = np.empty(shape=(sector_count * samples_per_sector, axis_count), dtype=self.dtype)
+        # (sector, sample, axis) view of the same output, matching the raw values
+        sector_values = self.sample_values.reshape(sector_count, samples_per_sector, axis_count)
         current_axis = 0
 
         if self.include_time:
@@ -614,59 +718,78 @@ class CwaData(BaseData):
             if self.verbose: print('Timestamp interpolate...', flush=True)
             
             #with np.printoptions(threshold=np.inf):
-            #    print(np.array2string(self.df['timestamp_index'].values, separator='\n'), flush=True)
+            #    print(np.array2string(self.cols['timestamp_index'], separator='\n'), flush=True)
 
             # Interpolate timestamps
             # np.interp() does not extrapolate to the few samples before/after first/last timestamp
             # so, slight hack, if needed, extrapolate the first timestamp back to 0
-            if len(self.df['timestamp_index']) > 1 and self.df['timestamp_index'][0] > 0:
-                deltaIndex = self.df['timestamp_index'][1] - self.df['timestamp_index'][0]
+            timestamp_index = self.cols['timestamp_index']
+            timestamp = self.cols['timestamp']
+            if len(timestamp_index) > 1 and timestamp_index[0] > 0:
+                deltaIndex = timestamp_index[1] - timestamp_index[0]
                 if deltaIndex > 0:
                     if self.verbose: print('Timestamp interpolate... extrapolate to start', flush=True)
-                    deltaTime = self.df['timestamp'][1] - self.df['timestamp'][0]
+                    deltaTime = timestamp[1] - timestamp[0]
                     deltaRate = deltaTime / deltaIndex
-                    #self.df['timestamp'][0] -= deltaRate * self.df['timestamp_index'][0]
-                    self.df.loc[0, 'timestamp'] -= deltaRate * self.df['timestamp_index'][0]
-                    #self.df['timestamp_index'][0] = 0
-                    self.df.loc[0, 'timestamp_index'] = 0
+                    timestamp[0] -= deltaRate * timestamp_index[0]
+                    timestamp_index[0] = 0
 
-            self.sample_values[:,current_axis] = np.interp(np.arange(0, self.df.shape[0] * self.data_format['sampleCount']), self.df['timestamp_index'], self.df['timestamp'])
+            # (the sample numbers are interpolated as integers, no float copy of the query points is needed)
+            sample_index = np.arange(len(timestamp) * self.data_format['sampleCount'], dtype=np.int64)
+            self.sample_values[:,current_axis] = np.interp(sample_index, timestamp_index, timestamp)
+            del sample_index
             self.labels = self.labels + ['time']
             current_axis += 1
 
-        if self.has_accel:
-            if self.verbose: print('Sample data: scaling accel... 1/' + str(self.data_format['accelUnit']), flush=True)
-            self.sample_values[:,current_axis:current_axis+3] = self.raw_samples[:, self.data_format['accelAxis']:self.data_format['accelAxis']+3] * (1.0 / self.data_format['accelUnit'])
-            self.labels = self.labels + ['accel_x', 'accel_y', 'accel_z']
-            current_axis += 3
-
+        self.accel_raw = None
+        accel_raw_sectors = None
+        if self.has_accel and self.accel_dtype is not None:
+            # Keep the fixed-point values (units of 1/accelUnit g) separately, deferring any conversion to float
+            if self.verbose: print('Sample data: keeping raw accel... 1/' + str(self.data_format['accelUnit']), flush=True)
+            self.accel_raw = np.empty(shape=(sector_count * samples_per_sector, 3), dtype=np.int16)
+            accel_raw_sectors = self.accel_raw.reshape(sector_count, samples_per_sector, 3)
+
+        # Scale for each included sensor (a scalar, or per-sector if the unit changes within the file), and its output column, in output order
+        sensor_scales = []
+        if self.has_accel and self.accel_dtype is None:
+            sensor_scales.append(('accel', self.data_format['accelAxis'], self.data_format['accelUnit'], self._sample_scale(self.cols['accel_unit'], self.data_format['accelUnit'])))
         if self.has_gyro:
-            if self.verbose: print('Sample data: scaling gyro... 1/' + str(self.data_format['gyroUnit']), flush=True)
-            self.sample_values[:,current_axis:current_axis+3] = self.raw_samples[:, self.data_format['gyroAxis']:self.data_format['gyroAxis']+3] * (1.0 / self.data_format['gyroUnit'])
-            self.labels = self.labels + ['gyro_x', 'gyro_y', 'gyro_z']
-            current_axis += 3
-
+            sensor_scales.append(('gyro', self.data_format['gyroAxis'], self.data_format['gyroUnit'], self._sample_scale(32768.0 / self.cols['gyro_range'], self.data_format['gyroUnit'])))
         if self.has_mag:
-            if self.verbose: print('Sample data: scaling mag... 1/' + str(self.data_format['magUnit']), flush=True)
-            self.sample_values[:,current_axis:current_axis+3] = self.raw_samples[:, self.data_format['magAxis']:self.data_format['magAxis']+3] * (1.0 / self.data_format['magUnit'])
-            self.labels = self.labels + ['mag_x', 'mag_y', 'mag_z']
+            sensor_scales.append(('mag', self.data_format['magAxis'], self.data_format['magUnit'], 1.0 / self.data_format['magUnit']))
+        sensor_columns = []
+        for name, raw_axis, unit, scale in sensor_scales:
+            if self.verbose: print('Sample data: scaling ' + name + '... 1/' + str(unit), flush=True)
+            sensor_columns.append((raw_axis, scale, current_axis))
+            self.labels = self.labels + [name + '_x', name + '_y', name + '_z']
             current_axis += 3
 
+        # Decode and scale blocks of sectors (only after the time interpolation, so that its temporaries are not held at the same time),
+        # the blocks are independent and NumPy releases the GIL in the ufuncs, so they are spread over a few threads where there are cores
+        if self.verbose: print('Sample data: decoding (' + self._extract.__name__ + ')...', flush=True)
+        blocks = [(start, min(start + _UNPACK_BLOCK_SECTORS, sector_count)) for start in range(0, sector_count, _UNPACK_BLOCK_SECTORS)]
+        if _SCALE_WORKERS > 1 and len(blocks) > 1:
+            with ThreadPoolExecutor(max_workers=_SCALE_WORKERS) as executor:
+                list(executor.map(lambda block: self._decode_sector_block(block[0], block[1], sensor_columns, sector_values, accel_raw_sectors), blocks))
+        else:
+            for start, end in blocks:
+                self._decode_sector_block(start, end, sensor_columns, sector_values, accel_raw_sectors)
+
+        # Light and temperature are per-sector, interpolated to each sample together (they share the same points)
+        sensor_series = []
         if self.include_light:
-            if self.verbose: print('Light interpolate...', flush=True)
             # Resample light ((self.header['deviceType'] == 'AX6') values could be scaled by 10 to match AX3?)
-            self.sample_values[:,current_axis] = np.interp(np.arange(0, self.df.shape[0] * self.data_format['sampleCount']), self.df['sample_index'], self.df['scale_light'] & 0x3ff)
-            self.labels = self.labels + ['light']
-            current_axis += 1
-
+            sensor_series.append(('light', self.cols['light']))
         if self.include_temperature:
-            if self.verbose: print('Temperature interpolate...', flush=True)
             # Resample temperature, scaled
-            self.sample_values[:,current_axis] = np.interp(np.arange(0, self.df.shape[0] * self.data_format['sampleCount']), self.df['sample_index'], (self.df['temperature'] & 0x3ff) * (75.0 / 256) - 50)
-            self.labels = self.labels + ['temperature']
-            current_axis += 1
+            sensor_series.append(('temperature', _TEMPERATURE_TABLE[self.cols['temperature'] & 0x3ff]))
+        if len(sensor_series) > 0:
+            if self.verbose: print('Light/temperature interpolate...', flush=True)
+            _interp_sectors([values for _, values in sensor_series], self.data_format['sampleCount'], [self.sample_values[:,current_axis + i] for i in range(len(sensor_series))])
+            for label, _ in sensor_series:
+                self.labels = self.labels + [label]
+                current_axis += 1
         
-        del self.raw_samples
         self.samples = None
         if self.verbose: print('Interpreted data', flush=True)
         
@@ -675,7 +798,7 @@ class CwaData(BaseData):
 
 
 
-    def __init__(self, filename, verbose=False, include_time=True, include_accel=True, include_gyro=True, include_mag=True, include_light=False, include_temperature=False, diagnostic=False):
+    def __init__(self, filename, verbose=False, include_time=True, include_accel=True, include_gyro=True, include_mag=True, include_light=False, include_temperature=False, diagnostic=False, accel_dtype=None, use_mmap=True, dtype=np.float64):
         """
         Construct a CWA data object from a file.
 
@@ -688,8 +811,11 @@ class CwaData(BaseData):
         :param include_light: Include the light indicator ADC readings, nearest-neighbor interpolated for each row.
         :param include_temperature: Include the internal temperature readings, nearest-neighbor interpolated for each row.
         :param diagnostic: (Internal use) Output diagnostic-level information.
+        :param accel_dtype: (Default None) accelerometer axes are scaled to 'g' in the sample values; 'int16' instead keeps the raw fixed-point values separately (see get_accel_raw() and get_accel_g()).
+        :param use_mmap: (Default) memory-map the file; otherwise read the whole file into memory.
+        :param dtype: (Default float64) type of the sample values; float32 halves the memory used, but cannot hold epoch times precisely so requires include_time=False.
         """
-        super().__init__(filename, verbose)
+        super().__init__(filename, verbose, use_mmap)
         self.diagnostic = diagnostic
         #if self.diagnostic: print('Diagnostic level...', flush=True)
 
@@ -702,10 +828,25 @@ class CwaData(BaseData):
         self.include_light = include_light
         self.include_temperature = include_temperature
 
+        if accel_dtype is not None and np.dtype(accel_dtype) != np.int16:
+            raise Exception('Unsupported accelerometer type: ' + str(accel_dtype))
+        self.accel_dtype = accel_dtype
+
+        # float32 has a 24-bit significand, so seconds since the epoch would only be to the nearest ~2 minutes
+        if np.dtype(dtype) not in (np.float32, np.float64):
+            raise Exception('Unsupported sample value type: ' + str(dtype))
+        if np.dtype(dtype) == np.float32 and include_time:
+            raise Exception('Sample value type float32 cannot hold the time precisely (use include_time=False)')
+        self.dtype = np.dtype(dtype)
+
         self.fh = None
+        self.cols = {}      # per-sector column arrays (see the .df property)
+        self._views = []    # memoryview objects exported over full_buffer, released on close()
 
         self.all_data_read = False
         self._read_data()
+        # Release the file when closed, or when garbage collected (including at interpreter exit)
+        self._finalizer = weakref.finalize(self, CwaData._static_close, self.fh, self.full_buffer, self._views)
         self._parse_header()
         elapsed_time = time.time() - start_time
         if self.verbose: print('Header done... (elapsed=' + str(elapsed_time) + ')', flush=True)
@@ -713,31 +854,66 @@ class CwaData(BaseData):
 
     # Current model reads all of the data in one go (and releases the file)
     def _ensure_all_data_read(self):
-        start_time = time.time()
         if self.all_data_read:
             return
+        # (only timed when reporting)
+        start_time = time.time() if self.verbose else 0
         self.all_data_read = True
         self.report = self._parse_data()
         self.all_segments = self._find_segments()
         self._interpret_samples()
 
-        elapsed_time = time.time() - start_time
-        if self.verbose: print('Read done... (elapsed=' + str(elapsed_time) + ')', flush=True)
+        if self.verbose: print('Read done... (elapsed=' + str(time.time() - start_time) + ')', flush=True)
         self.close()
 
 
+    @staticmethod
+    def _static_close(fh, full_buffer, views):
+        """Release the views, buffer and file handle (used by the finalizer, so must not reference the instance)."""
+        try:
+            # Release any views of the buffer first, as a mmap() cannot be closed while they are exported
+            for view in views:
+                try:
+                    view.release()
+                except BufferError:
+                    pass
+            views.clear()
+            # Close if a mmap() (a read-only mapping, so closing is just an unmap with nothing to write back),
+            # otherwise the reference is just dropped (if large allocation not using mmap)
+            if isinstance(full_buffer, mmap.mmap) and not full_buffer.closed:
+                # Advise that the mapped pages are no longer needed so they can be dropped promptly (Linux only)
+                if hasattr(full_buffer, 'madvise') and sys.platform.startswith('linux') and len(full_buffer) > 0:
+                    try:
+                        full_buffer.madvise(mmap.MADV_DONTNEED, 0, len(full_buffer))
+                    except (AttributeError, OSError, ValueError):
+                        pass
+                try:
+                    full_buffer.close()
+                except BufferError:
+                    pass    # Arrays over the mapping are still referenced (e.g. finalized during garbage collection): it is unmapped when they are freed
+        finally:
+            # The file handle is always closed, even if the buffer could not be
+            if fh is not None:
+                fh.close()
+
+
     def close(self):
-        """Close the underlying file.  Automatically closed in with() block or when GC'd."""
-        if hasattr(self, 'full_buffer') and self.full_buffer is not None:
-            # Close if a mmap()
-            if hasattr(self.full_buffer, 'close'):
-                self.full_buffer.close()
-            # Delete buffer (if large allocation not using mmap)
-            del self.full_buffer
-            self.full_buffer = None
-        if hasattr(self, 'fh') and self.fh is not None:
-            self.fh.close()
-            self.fh = None
+        """Close the underlying file.  Automatically closed in with() block or when GC'd.  Safe to call more than once."""
+        # Arrays still in use are copied out of the buffer, and those only used for parsing are dropped, so that the views can be released
+        self.cols = {name: (np.array(col) if isinstance(col, np.ndarray) and col.base is not None else col) for name, col in getattr(self, 'cols', {}).items()}
+        self.np_data = None
+        self.data_buffer = None
+        self.full_buffer = self.fh = None
+        # The finalizer holds the resources and only runs once (later calls are a no-op)
+        finalizer = getattr(self, '_finalizer', None)
+        if finalizer is not None:
+            finalizer()
+
+
+    @property
+    def df(self):
+        """Per-sector values as a DataFrame, built on demand from the column arrays."""
+        return pd.DataFrame(self.cols)
 
 
     def get_sample_values(self):
@@ -750,6 +926,27 @@ class CwaData(BaseData):
         self._ensure_all_data_read()
         return self.sample_values
 
+    def get_accel_raw(self):
+        """
+        Get the accelerometer values in their raw fixed-point units (requires accel_dtype='int16').
+
+        :returns: An int16 ndarray of (accel_x, accel_y, accel_z) in units of 1/accelUnit g.
+        """
+        self._ensure_all_data_read()
+        if self.accel_raw is None:
+            raise Exception('Raw accelerometer values not kept (use accel_dtype=\'int16\')')
+        return self.accel_raw
+
+    def get_accel_g(self):
+        """
+        Get the accelerometer values in 'g', converted from the raw values on demand (requires accel_dtype='int16').
+
+        :returns: A float32 ndarray of (accel_x, accel_y, accel_z) in 'g'.
+        """
+        accel_raw = self.get_accel_raw()
+        scale = np.asarray(self._sample_scale(self.cols['accel_unit'], self.data_format['accelUnit']), dtype=np.float32)
+        return (accel_raw.reshape(-1, self.data_format['samplesPerSector'], 3).astype(np.float32) * scale).reshape(-1, 3)
+
     def get_samples(self, use_datetime64=True):
         """
         Return an DataFrame for (time, accel_x, accel_y, accel_z) or (time, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z)
@@ -759,12 +956,10 @@ class CwaData(BaseData):
         self._ensure_all_data_read()
         if self.include_time and use_datetime64:
             if self.verbose: print('Converting time...', flush=True)
-            # Samples exclude the current time (float seconds) column
-            samples = pd.DataFrame(self.sample_values[:,1:], columns=self.labels[1:])
             # Convert the float epoch time in seconds to a datetime64 integer in nanoseconds (Pandas default)
             time = (self.sample_values[:,0] * 1_000_000_000).astype('datetime64[ns]')
-            # Add time as first column
-            samples.insert(0, self.labels[0], time, True)
+            # Construct in one step with time as the first column, and the other columns as views of the sample values (rather than a copy of them and then inserting time)
+            samples = pd.DataFrame({self.labels[0]: time, **{label: self.sample_values[:,i + 1] for i, label in enumerate(self.labels[1:])}}, copy=False)
             if self.verbose: print('...done', flush=True)
         else:
             # Keep time (if used) in seconds
@@ -793,35 +988,43 @@ class CwaData(BaseData):
             return self.sample_values.shape[0]
         else:
             # Estimate
-            num_data_sectors = (len(self.full_buffer) - self.data_offset) / SECTOR_SIZE
+            num_data_sectors = (len(self.full_buffer) - self.data_offset) // SECTOR_SIZE     # (whole sectors only)
             sample_count_estimate = num_data_sectors * self.data_format['sampleCount']
             return sample_count_estimate
 
 
 def _export(cwa_data, filename):
     print('Exporting...')
-    with open(filename, "wt") as fh:
-        fh.write(','.join(cwa_data.labels) + '\n')
-        for row in cwa_data:
-            fh.write(_timestamp_string(row[0]) + ',' + ','.join([str(v) for v in row[1:]]) + '\n')
+    # Written by pandas' CSV writer rather than formatting each row
+    samples = pd.DataFrame(cwa_data.get_sample_values(), columns=cwa_data.labels)
+    if cwa_data.include_time:
+        # Time as 'YYYY-MM-DD hh:mm:ss.fff' text, formatted for the whole column at once (the same as the per-value CSV formatting)
+        samples['time'] = _csv_datetime_strings(samples['time'].to_numpy(), milliseconds=True).astype(str)
+    samples.to_csv(filename, index=False)
 
 
 def main():
-    filename = '../_local/data/mixed_wear.cwa'
+    import argparse
+    parser = argparse.ArgumentParser(description='Load a .CWA file (e.g. to time repeated loading).')
+    parser.add_argument('file', nargs='?', default='../_local/data/mixed_wear.cwa', help='path to the .CWA file')
+    parser.add_argument('--repeat', type=int, default=1, help='number of times to load the file')
+    parser.add_argument('--no-mmap', action='store_true', help='read the whole file rather than memory-mapping it')
+    args = parser.parse_args()
 
     #filename = '../../../_local/data/sample.cwa'
     #filename = '../../../_local/data/mixed_wear.cwa'
     #filename = '../../../_local/data/AX6-Sample-48-Hours.cwa'
     #filename = '../../../_local/data/AX6-Static-8-Day.cwa'
     #filename = '../../../_local/data/longitudinal_data.cwa'
-    with CwaData(filename, verbose=True, include_gyro=False, include_temperature=True) as cwa_data:
-        sample_values = cwa_data.get_sample_values()
-        samples = cwa_data.get_samples()
+    for _ in range(args.repeat):
+        with CwaData(args.file, verbose=True, include_gyro=False, include_temperature=True, use_mmap=not args.no_mmap) as cwa_data:
+            sample_values = cwa_data.get_sample_values()
+            samples = cwa_data.get_samples()
         
     print(sample_values)
     print(samples)
 
-    #_export(cwa_data, os.path.splitext(filename)[0] + '.cwa.csv')
+    #_export(cwa_data, os.path.splitext(args.file)[0] + '.cwa.csv')
 
     print('Done')
 
@@ -14,6 +14,15 @@ from openmovement.load.wav_load import WavData
 from openmovement.load.zip_helper import PotentiallyZippedFile
 
 
+# Loader class for each file extension, and the options that it takes
+_LOADERS = {
+    '.cwa': (CwaData, ('include_time', 'include_accel', 'include_gyro', 'include_mag', 'include_light', 'include_temperature')),
+    '.omx': (OmxData, ('include_time', 'include_accel', 'include_gyro', 'include_mag', 'include_light', 'include_temperature')),
+    '.wav': (WavData, ('include_time', 'include_accel', 'include_gyro', 'include_mag')),
+    '.csv': (CsvData, ('force_time', 'start_time', 'assumed_frequency')),
+}
+
+
 class MultiData(BaseData):
 
     def __init__(self, filename, verbose=False, include_time=True, include_accel=True, include_gyro=True, include_mag=True, include_light=False, include_temperature=False, force_time=True, start_time=0, assumed_frequency=None, filters=['*.cwa', '*.omx', '*.wav', '*.csv']):
@@ -38,21 +47,24 @@ class MultiData(BaseData):
         :param filter: (.zip file) Case-insensitive 'glob' string expressions to match the expected inner filename (default: ['*.cwa', '*.omx', '*.wav', '*.csv']).
         """
         super().__init__(filename, verbose)
+        # Summary values, fetched once from the inner data
+        self._start_time = None
+        self._sample_rate = None
+        self._num_samples = None
         self.potentially_zipped_file = PotentiallyZippedFile(self.filename, filters=filters, verbose=self.verbose)
         try:
             self.inner_filename = self.potentially_zipped_file.__enter__()
         
             ext = os.path.splitext(self.inner_filename)[1].lower()
-            if ext == '.cwa':
-                self.inner_data = CwaData(self.inner_filename, verbose=self.verbose, include_time=include_time, include_accel=include_accel, include_gyro=include_gyro, include_mag=include_mag, include_light=include_light, include_temperature=include_temperature)
-            elif ext == '.omx':
-                self.inner_data = OmxData(self.inner_filename, verbose=self.verbose, include_time=include_time, include_accel=include_accel, include_gyro=include_gyro, include_mag=include_mag, include_light=include_light, include_temperature=include_temperature)
-            elif ext == '.wav':
-                self.inner_data = WavData(self.inner_filename, verbose=self.verbose, include_time=include_time, include_accel=include_accel, include_gyro=include_gyro, include_mag=include_mag)
-            elif ext == '.csv':
-                self.inner_data = CsvData(self.inner_filename, verbose=self.verbose, force_time=force_time, start_time=start_time, assumed_frequency=assumed_frequency)
-            else:
+            if ext not in _LOADERS:
                 raise Exception('Unhandled file type: [' + ext + ']')
+            loader, option_names = _LOADERS[ext]
+            options = {
+                'include_time': include_time, 'include_accel': include_accel, 'include_gyro': include_gyro, 'include_mag': include_mag,
+                'include_light': include_light, 'include_temperature': include_temperature,
+                'force_time': force_time, 'start_time': start_time, 'assumed_frequency': assumed_frequency,
+            }
+            self.inner_data = loader(self.inner_filename, verbose=self.verbose, **{name: options[name] for name in option_names})
 
         except Exception as e:
             self.potentially_zipped_file.__exit__(None, None, None)
@@ -75,13 +87,19 @@ class MultiData(BaseData):
         return self.inner_data.get_samples(use_datetime64)
 
     def get_start_time(self):
-        return self.inner_data.get_start_time()
+        if self._start_time is None:
+            self._start_time = self.inner_data.get_start_time()
+        return self._start_time
 
     def get_sample_rate(self):
-        return self.inner_data.get_sample_rate()
+        if self._sample_rate is None:
+            self._sample_rate = self.inner_data.get_sample_rate()
+        return self._sample_rate
 
     def get_num_samples(self):
-        return self.inner_data.get_num_samples()
+        if self._num_samples is None:
+            self._num_samples = self.inner_data.get_num_samples()
+        return self._num_samples
     
 
 def main():
@@ -8,6 +8,7 @@ import sys
 import time
 from datetime import datetime
 from struct import *
+from urllib.parse import unquote_plus
 
 import numpy as np
 import pandas as pd
@@ -17,6 +18,9 @@ from openmovement.load.base_data import BaseData
 SECTOR_SIZE = 512
 EPOCH = datetime(1970, 1, 1)
 
+# Temperature (degrees C) for each 10-bit raw reading, looked up per-sector rather than calculated
+_TEMPERATURE_TABLE = np.arange(1024) * (75.0 / 256) - 50
+
 
 def _fast_timestamp(value):
     """Faster date/time parsing.  This does not include 'always' limits; invalid dates do not cause an error; the first call will be slower as a lookup table is created."""
@@ -96,35 +100,8 @@ def _timestamp_string(timestamp):
 
 
 def _urldecode(input):
-    """URL-decode metadata"""
-    output = bytearray()
-    nibbles = 0
-    value = 0
-    # Each input character
-    for char in input:
-        if char == '%':
-            # Begin a percent-encoded hex pair
-            nibbles = 2
-            value = 0
-        elif nibbles > 0:
-            # Parse the percent-encoded hex digits
-            value *= 16
-            if char >= 'a' and char <= 'f':
-                value += ord(char) + 10 - ord('a')
-            elif char >= 'A' and char <= 'F':
-                value += ord(char) + 10 - ord('A')
-            elif char >= '0' and char <= '9':
-                value += ord(char) - ord('0')
-            nibbles -= 1
-            if nibbles == 0:
-                output.append(value)
-        elif char == '+':
-            # Treat plus as space (application/x-www-form-urlencoded)
-            output.append(ord(' '))
-        else:
-            # Preserve character
-            output.append(ord(char))
-    return output.decode('utf-8')
+    """URL-decode metadata (percent-encoded UTF-8, with plus as space as application/x-www-form-urlencoded)"""
+    return unquote_plus(input, encoding='utf-8')
 
 
 def _omx_parse_metadata(data):
@@ -434,7 +411,8 @@ class OmxData(BaseData):
     ### !!! HACK: THIS IS ACTUALLY .CWA DATA PARSING -- TODO: MODIFY FOR OMX
     def _parse_data(self):
         if self.verbose: print('Interpreting data...', flush=True)
-        self.data_buffer = self.full_buffer[self.data_offset:]
+        # (a view rather than a slice, which would copy all of the data out of the buffer or mmap)
+        self.data_buffer = memoryview(self.full_buffer)[self.data_offset:]
 
         # Data type for numpy loading
         dt_omx = np.dtype([
@@ -535,11 +513,11 @@ class OmxData(BaseData):
         if self.data_format['channels'] == 3 and self.data_format['bytesPerSample'] == 4:
             if self.verbose: print('Sample data: unpacking...', flush=True)
             # Create 2D strided view of all raw sample data packed DWORDs, flatten to a single array (copies), unpack
-            np_dword = np.frombuffer(self.data_buffer[30:len(self.data_buffer)-2], dtype=np.dtype('<I'), count=-1)
+            np_dword = np.frombuffer(self.data_buffer, dtype=np.dtype('<I'), offset=30, count=(len(self.data_buffer) - 32) // 4)
             dword_view = np.lib.stride_tricks.as_strided(np_dword, (120, len(self.data_buffer) // SECTOR_SIZE), (4, SECTOR_SIZE), writeable=False)
             packed = dword_view.flatten(order='K')
             exponent = packed >> 30
-            self.raw_samples = np.ndarray(shape=(dword_view.size, 3), dtype=np.int16)
+            self.raw_samples = np.empty(shape=(dword_view.size, 3), dtype=np.int16)
             self.raw_samples[:,0] = ((((packed      ) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
             self.raw_samples[:,1] = ((((packed >> 10) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
             self.raw_samples[:,2] = ((((packed >> 20) & 0x3ff) ^ 0x0200) - 0x0200) << exponent
@@ -548,7 +526,7 @@ class OmxData(BaseData):
         elif self.data_format['bytesPerAxis'] == 2:
             if self.verbose: print('Sample data: flattening...', flush=True)
             # Create 2D strided view of all raw sample data WORDs before flattening and reshaping
-            np_word = np.frombuffer(self.data_buffer[30:len(self.data_buffer)-2], dtype=np.dtype('<h'), count=-1)
+            np_word = np.frombuffer(self.data_buffer, dtype=np.dtype('<h'), offset=30, count=(len(self.data_buffer) - 32) // 2)
             word_view = np.lib.stride_tricks.as_strided(np_word, (240, len(self.data_buffer) // SECTOR_SIZE), (2, SECTOR_SIZE), writeable=False)
             self.raw_samples = word_view.flatten(order='K')
             self.raw_samples = np.reshape(self.raw_samples, (-1, self.data_format['channels']))
@@ -571,7 +549,7 @@ class OmxData(BaseData):
         self.labels = []
 
         if self.verbose: print('Create output...', flush=True)
-        self.sample_values = np.ndarray(shape=(self.raw_samples.shape[0], axis_count))
+        self.sample_values = np.empty(shape=(self.raw_samples.shape[0], axis_count))
         current_axis = 0
 
         if self.include_time:
@@ -611,7 +589,7 @@ class OmxData(BaseData):
         if self.include_temperature:
             if self.verbose: print('Temperature interpolate...', flush=True)
             # Resample temperature, scaled
-            self.sample_values[:,current_axis] = np.interp(np.arange(0, self.df.shape[0] * self.data_format['sampleCount']), self.df['sample_index'], (self.df['temperature'] & 0x3ff) * (75.0 / 256) - 50)
+            self.sample_values[:,current_axis] = np.interp(np.arange(0, self.df.shape[0] * self.data_format['sampleCount']), self.df['sample_index'], _TEMPERATURE_TABLE[self.df['temperature'].to_numpy() & 0x3ff])
             self.labels = self.labels + ['temperature']
             current_axis += 1
         
@@ -663,25 +641,36 @@ class OmxData(BaseData):
 
     # Current model reads all of the data in one go (and releases the file)
     def _ensure_all_data_read(self):
-        start_time = time.time()
         if self.all_data_read:
             return
+        # (only timed when reporting)
+        start_time = time.time() if self.verbose else 0
         self.all_data_read = True
         self._parse_data()
         self._find_segments()
         self._interpret_samples()
 
-        elapsed_time = time.time() - start_time
-        if self.verbose: print('Read done... (elapsed=' + str(elapsed_time) + ')', flush=True)
+        if self.verbose: print('Read done... (elapsed=' + str(time.time() - start_time) + ')', flush=True)
         self.close()
 
 
     def close(self):
         """Close the underlying file.  Automatically closed in with() block or when GC'd."""
+        # Release the arrays and view over the buffer, so that it can be closed
+        self.np_data = None
+        if getattr(self, 'data_buffer', None) is not None:
+            try:
+                self.data_buffer.release()
+            except BufferError:
+                pass
+            self.data_buffer = None
         if hasattr(self, 'full_buffer') and self.full_buffer is not None:
-            # Close if a mmap()
+            # Close if a mmap() (if an array is still using it, the mapping is instead released when that is garbage collected)
             if hasattr(self.full_buffer, 'close'):
-                self.full_buffer.close()
+                try:
+                    self.full_buffer.close()
+                except BufferError:
+                    pass
             # Delete buffer (if large allocation not using mmap)
             del self.full_buffer
             self.full_buffer = None
@@ -709,12 +698,10 @@ class OmxData(BaseData):
         self._ensure_all_data_read()
         if self.include_time and use_datetime64:
             if self.verbose: print('Converting time...', flush=True)
-            # Samples exclude the current time (float seconds) column
-            samples = pd.DataFrame(self.sample_values[:,1:], columns=self.labels[1:])
             # Convert the float epoch time in seconds to a datetime64 integer in nanoseconds (Pandas default)
             time = (self.sample_values[:,0] * 1_000_000_000).astype('datetime64[ns]')
-            # Add time as first column
-            samples.insert(0, self.labels[0], time, True)
+            # Construct in one step with time as the first column, and the other columns as views of the sample values (rather than a copy of them and then inserting time)
+            samples = pd.DataFrame({self.labels[0]: time, **{label: self.sample_values[:,i + 1] for i, label in enumerate(self.labels[1:])}}, copy=False)
             if self.verbose: print('...done', flush=True)
         else:
             # Keep time (if used) in seconds
@@ -334,7 +334,7 @@ class WavData(BaseData):
         self.labels = []
 
         if self.verbose: print('Create output...', flush=True)
-        self.sample_values = np.ndarray(shape=(self.raw_samples.shape[0], axis_count))
+        self.sample_values = np.empty(shape=(self.raw_samples.shape[0], axis_count))
         current_axis = 0
 
         if self.include_time:
@@ -437,12 +437,10 @@ class WavData(BaseData):
         self._ensure_all_data_read()
         if self.include_time and use_datetime64:
             if self.verbose: print('Converting time...', flush=True)
-            # Samples exclude the current time (float seconds) column
-            samples = pd.DataFrame(self.sample_values[:,1:], columns=self.labels[1:])
             # Convert the float epoch time in seconds to a datetime64 integer in nanoseconds (Pandas default)
             time = (self.sample_values[:,0] * 1_000_000_000).astype('datetime64[ns]')
-            # Add time as first column
-            samples.insert(0, self.labels[0], time, True)
+            # Construct in one step with time as the first column, and the other columns as views of the sample values (rather than a copy of them and then inserting time)
+            samples = pd.DataFrame({self.labels[0]: time, **{label: self.sample_values[:,i + 1] for i, label in enumerate(self.labels[1:])}}, copy=False)
             if self.verbose: print('...done', flush=True)
         else:
             # Keep time, if used, in seconds
@@ -1,24 +1,16 @@
 import numpy as np
 import pandas as pd
 
-def split_into_epochs(sample_values, epoch_time_interval, timestamps=None, relative_to_time=None, return_indices=False):
+def _epoch_start_indices(sample_values, epoch_time_interval, timestamps=None, relative_to_time=None):
     """
-    Split the given ndarray data (e.g. [[time,accel_x,accel_y,accel_y,*_]])
-    ...based on the timestamps array (will use the first column if not given)
-    ...into a list of epochs of the specified time interval.
+    The index of the first sample of each epoch of the given ndarray data (see split_into_epochs()).
     """
 
     # The method requires at least two samples
     if sample_values.shape[0] <= 0:
-        if return_indices:
-            return ([], np.zeros(0,dtype=int))
-        else:
-            return []
+        return np.zeros(0,dtype=int)
     if sample_values.shape[0] <= 1:
-        if return_indices:
-            return ([sample_values], np.zeros(1,dtype=int))
-        else:
-            return [sample_values]
+        return np.zeros(1,dtype=int)
 
     # Use the first column if timestamps not given
     if timestamps is None:
@@ -27,17 +19,18 @@ def split_into_epochs(sample_values, epoch_time_interval, timestamps=None, relat
     # Determine if timestamps are datetime64 (rather than seconds-since-epoch)
     is_dt64 = np.issubdtype(timestamps.dtype, np.datetime64)
 
-    # If using datetime64, ensure epoch_time_interval is a np.timedelta64
-    if is_dt64 and not np.issubdtype(epoch_time_interval, np.timedelta64):
-        epoch_time_interval = np.timedelta64(epoch_time_interval, 's')
+    # If using datetime64, ensure epoch_time_interval is a np.timedelta64 (seconds, which may be fractional, are converted to nanoseconds)
+    if is_dt64 and not isinstance(epoch_time_interval, np.timedelta64):
+        epoch_time_interval = np.timedelta64(int(round(epoch_time_interval * 1_000_000_000)), 'ns')
 
     # relative_to_time: None means the epochs start with the first sample; otherwise they  use a fixed epoch in seconds (e.g. 0=wall clock time)
     if relative_to_time is None:
         epoch_time_offset = timestamps[0]
-    elif is_dt64:
-        epoch_time_offset = relative_to_time
+    elif is_dt64 and not isinstance(relative_to_time, np.datetime64):
+        # Seconds since the epoch, as a datetime64 to match the timestamps
+        epoch_time_offset = np.datetime64(int(round(relative_to_time * 1_000_000_000)), 'ns')
     else:
-        epoch_time_offset = np.datetime64(relative_to_time, 's')
+        epoch_time_offset = relative_to_time
 
     # Must use 1D timestamps
     if timestamps.ndim != 1:
@@ -50,26 +43,54 @@ def split_into_epochs(sample_values, epoch_time_interval, timestamps=None, relat
             raise Exception('Each sample must have a timestamps')
 
     # Quantize into interval numbers
-    epoch_time_index = (timestamps - epoch_time_offset) // epoch_time_interval
+    if is_dt64:
+        # (timedelta64 floor-division is integer arithmetic)
+        epoch_time_index = (timestamps - epoch_time_offset) // epoch_time_interval
+    else:
+        # Floor-division (exact at multiples of the interval, unlike the floor of the rounded quotient), in-place on the one temporary
+        epoch_time_index = np.subtract(timestamps, epoch_time_offset, dtype=np.float64)
+        np.floor_divide(epoch_time_index, epoch_time_interval, out=epoch_time_index)
     
-    # Calculate a mask where the index has changed from the previous one
-    epoch_is_different_index = np.concatenate(([False], epoch_time_index[1:] != epoch_time_index[0:-1]))
+    # Find the index of each change of epoch (where the index differs from the previous one)
+    epoch_indices = np.flatnonzero(np.diff(epoch_time_index)) + 1
+    del epoch_time_index
 
-    # Find the index of each change of epoch
-    epoch_indices = np.nonzero(epoch_is_different_index)[0]
+    # Include index of first epoch
+    return np.insert(epoch_indices, 0, [0], axis=None)
 
-    # Split into epochs
-    epochs = np.array_split(sample_values, epoch_indices, axis=0)
 
-    del epoch_time_index
-    del epoch_is_different_index
+def _iter_epochs(sample_values, epoch_indices):
+    """
+    Slices of the sample data between each epoch start index (and the end of the data).
+    """
+    epoch_ends = np.append(epoch_indices[1:], sample_values.shape[0])
+    for start, end in zip(epoch_indices.tolist(), epoch_ends.tolist()):
+        yield sample_values[start:end]
+
+
+def split_into_epochs_iter(sample_values, epoch_time_interval, timestamps=None, relative_to_time=None):
+    """
+    As split_into_epochs(), but a generator of each epoch (a view of the sample data), 
+    so that per-epoch calculations do not need to hold a list of every epoch.
+    """
+    epoch_indices = _epoch_start_indices(sample_values, epoch_time_interval, timestamps, relative_to_time)
+    return _iter_epochs(sample_values, epoch_indices)
+
+
+def split_into_epochs(sample_values, epoch_time_interval, timestamps=None, relative_to_time=None, return_indices=False):
+    """
+    Split the given ndarray data (e.g. [[time,accel_x,accel_y,accel_y,*_]])
+    ...based on the timestamps array (will use the first column if not given)
+    ...into a list of epochs of the specified time interval.
+    """
+    epoch_indices = _epoch_start_indices(sample_values, epoch_time_interval, timestamps, relative_to_time)
+
+    # Split into epochs
+    epochs = list(_iter_epochs(sample_values, epoch_indices))
 
     if return_indices:
-        # Include index of first epoch
-        epoch_indices = np.insert(epoch_indices, 0, [0], axis=None)
         return (epochs, epoch_indices)
     else:
-        del epoch_indices
         return epochs
 
 
@@ -78,17 +99,13 @@ def _split_into_blocks_reshape_ndarray(sample_values, epoch_size_samples):
     """
     Returns a reshaped ndarray view of the given ndarray sample data (e.g. [[time,accel_x,accel_y,accel_y,*_]]) 
     as blocks of equal count samples.  As the blocks must be of a fixed size, any remainder is discarded.
+    The view is always of the original data (even if it is strided, e.g. a column selection), and is read-only.
     """
     sample_count = sample_values.shape[0]
-    num_axes = None
-    if sample_values.ndim > 1:
-        num_axes = sample_values.shape[1]
     num_windows = sample_count // epoch_size_samples
-    covered_sample_count = num_windows * epoch_size_samples
-    if num_axes is not None:
-        epochs = np.reshape(sample_values[0:covered_sample_count,:], (num_windows, -1, num_axes))
-    else:
-        epochs = np.reshape(sample_values[0:covered_sample_count], (num_windows, -1))
+    # Splitting the first axis only needs the row stride to be multiplied up, whatever the layout of the other axes
+    row_stride = sample_values.strides[0]
+    epochs = np.lib.stride_tricks.as_strided(sample_values, shape=(num_windows, epoch_size_samples) + sample_values.shape[1:], strides=(row_stride * epoch_size_samples, row_stride) + sample_values.strides[1:], writeable=False)
     return epochs
 
 
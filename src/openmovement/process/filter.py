@@ -1,10 +1,13 @@
 # Frequency filtering data
+import numpy as np
 from scipy.signal import butter
 from scipy.signal import lfilter
 from scipy.signal import sosfilt
+from scipy.signal import sosfiltfilt
 
-def filter(samples, sample_freq=None, low_freq=None, high_freq=None, order=4, type='butter', method='ba'):
+def filter(samples, sample_freq=None, low_freq=None, high_freq=None, order=4, type='butter', method='ba', zero_phase=False):
     # method is 'ba' or 'sos'
+    # zero_phase filters forwards and backwards (no phase delay, twice the order), only with the 'sos' method
 
     # Source sample frequency
     if sample_freq is None:
@@ -23,10 +26,20 @@ def filter(samples, sample_freq=None, low_freq=None, high_freq=None, order=4, ty
 
     if method == 'ba':
         b, a = filter
+        if zero_phase:
+            raise Exception('Zero-phase filtering requires the sos method')
         results = lfilter(b, a, samples, axis=0)
     elif method == 'sos':
         sos = filter
-        results = sosfilt(sos, samples, axis=0)
+        # Filter reduced-precision samples at that precision
+        if samples.dtype == np.float32:
+            sos = sos.astype(np.float32)
+        if zero_phase:
+            # Default padding, reduced for very short inputs
+            padlen = 3 * (2 * len(sos) + 1)
+            results = sosfiltfilt(sos, samples, axis=0, padlen=min(padlen, samples.shape[0] - 1))
+        else:
+            results = sosfilt(sos, samples, axis=0)
     else:
         raise Exception('Unknown filter method')
     
@@ -0,0 +1,5 @@
+# Allow the tests to import the package from the source tree (as the standalone tests do through their path hack)
+import os
+import sys
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')))
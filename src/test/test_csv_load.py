@@ -0,0 +1,113 @@
+"""
+Tests of the .CSV loader and its date/time helpers.
+"""
+
+# --- HACK: Allow the test to run standalone as specified by a file in the repo (rather than only through the module)
+if __name__ == '__main__' and __package__ is None:
+    import sys; import os; sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))), '..')))
+# ---
+
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from openmovement.load import csv_load
+from openmovement.load.csv_load import CsvData, _csv_datetime_string, _csv_datetime_ms_string, _csv_datetime_strings
+
+
+def _random_times(count, seed):
+    rng = np.random.default_rng(seed)
+    # Seconds since the epoch over several years, with fractional parts including those close to the millisecond/second boundaries
+    times = rng.uniform(1.5e9, 1.7e9, count)
+    times[0::4] = np.floor(times[0::4])
+    times[1::4] = np.floor(times[1::4] * 1000) / 1000
+    times[2::4] = np.floor(times[2::4]) + 0.9999999
+    return times
+
+
+def testDatetimeStringsMatchPerValue():
+    times = _random_times(20000, 1)
+    strings = _csv_datetime_strings(times)
+    assert strings.dtype == np.dtype('S19')
+    assert [value.decode() for value in strings] == [_csv_datetime_string(time) for time in times]
+
+
+def testDatetimeMsStringsMatchPerValue():
+    times = _random_times(20000, 2)
+    strings = _csv_datetime_strings(times, milliseconds=True)
+    assert strings.dtype == np.dtype('S23')
+    assert [value.decode() for value in strings] == [_csv_datetime_ms_string(time) for time in times]
+
+
+def testDatetimeStringsFromDatetime64():
+    times = np.array(['2021-03-04T05:06:07.089123456', '1999-12-31T23:59:59.999999999'], dtype='datetime64[ns]')
+    assert list(_csv_datetime_strings(times)) == [b'2021-03-04 05:06:07', b'1999-12-31 23:59:59']
+    assert list(_csv_datetime_strings(times, milliseconds=True)) == [b'2021-03-04 05:06:07.089', b'1999-12-31 23:59:59.999']
+
+
+def _read_csv(source, **kwargs):
+    with CsvData(source, **kwargs) as csv_data:
+        sample_values = csv_data.get_sample_values()
+        samples = csv_data.get_samples()
+        labels = list(csv_data.labels)
+    return labels, sample_values, samples
+
+
+def _assert_backends_match(data, monkeypatch, **kwargs):
+    """Parse with the PyArrow reader and with the fallback parser (from a file, as PyArrow reads it by name, and from bytes), and check they give the same result"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'data.csv')
+        with open(filename, 'wb') as fh:
+            fh.write(data)
+        results = [_read_csv(filename, **kwargs), _read_csv(data, **kwargs)]
+        with monkeypatch.context() as m:
+            m.setattr(csv_load, 'pyarrow', None)
+            results += [_read_csv(filename, **kwargs), _read_csv(data, **kwargs)]
+
+    labels, sample_values, samples = results[0]
+    for other_labels, other_sample_values, other_samples in results[1:]:
+        assert other_labels == labels
+        assert other_sample_values.dtype == sample_values.dtype
+        assert np.array_equal(other_sample_values, sample_values)
+        assert list(other_samples.columns) == list(samples.columns)
+        assert list(other_samples.dtypes) == list(samples.dtypes)
+        for column in samples.columns:
+            assert np.array_equal(other_samples[column].to_numpy(), samples[column].to_numpy())
+    return labels, samples
+
+
+def testPyArrowMatchesParserTimestamps(monkeypatch):
+    pytest.importorskip('pyarrow')
+    times = np.datetime64('2021-03-04T05:06:07.000', 'ns') + np.arange(5000) * np.timedelta64(10, 'ms') + np.timedelta64(3, 'us')
+    rng = np.random.default_rng(3)
+    values = rng.uniform(-8, 8, (len(times), 3)).round(4)
+    data = ('time,accel_x,accel_y,accel_z\n' + ''.join(str(time).replace('T', ' ') + ',%.4f,%.4f,%.4f\n' % tuple(row) for time, row in zip(times, values))).encode()
+
+    labels, samples = _assert_backends_match(data, monkeypatch)
+    assert labels == ['time', 'accel_x', 'accel_y', 'accel_z']
+    # Nanosecond timestamps kept exactly
+    assert samples['time'].dtype == np.dtype('datetime64[ns]')
+    assert np.array_equal(samples['time'].to_numpy(), times)
+    assert np.array_equal(samples[['accel_x', 'accel_y', 'accel_z']].to_numpy(), values)
+
+
+def testPyArrowMatchesParserNumeric(monkeypatch):
+    pytest.importorskip('pyarrow')
+    rng = np.random.default_rng(4)
+    values = rng.integers(-4096, 4096, (3000, 3))
+    data = ('t,x,y,z\n' + ''.join('%.2f,%d,%d,%d\n' % ((i / 100,) + tuple(row)) for i, row in enumerate(values))).encode()
+
+    _assert_backends_match(data, monkeypatch)
+    _assert_backends_match(data, monkeypatch, dtypes=np.float32)
+
+
+def main():
+    testDatetimeStringsMatchPerValue()
+    testDatetimeMsStringsMatchPerValue()
+    testDatetimeStringsFromDatetime64()
+    print('Done')
+
+if __name__ == '__main__':
+    main()
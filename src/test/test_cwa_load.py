@@ -0,0 +1,237 @@
+"""
+Tests of loading .CWA files, from small synthetic files of a few sectors.
+"""
+
+# --- HACK: Allow the test to run standalone as specified by a file in the repo (rather than only through the module)
+if __name__ == '__main__' and __package__ is None:
+    import sys; import os; sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))), '..')))
+# ---
+
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from openmovement.load import cwa_load
+from openmovement.load.cwa_load import CwaData
+
+
+# 100 Hz, +/-8 g
+_RATE_CODE = 0x4A
+
+# Time of 2021-03-04 05:06:00, the minute that the sectors are time-stamped in
+_EPOCH_TIME = 1614834360
+
+def _packed_timestamp(year, month, day, hours, minutes, seconds):
+    return ((year - 2000) << 26) | (month << 22) | (day << 17) | (hours << 12) | (minutes << 6) | seconds
+
+
+def _header(hardware_type, sensor_config):
+    block = bytearray(b'\xff' * 1024)
+    block[0:2] = b'MD'
+    struct.pack_into('<H', block, 2, 1020)
+    block[4] = hardware_type
+    struct.pack_into('<H', block, 5, 1234)                  # device id
+    struct.pack_into('<I', block, 7, 42)                    # session id
+    struct.pack_into('<I', block, 13, 0)                    # logging start
+    struct.pack_into('<I', block, 17, 0xffffffff)           # logging end
+    block[35] = sensor_config
+    block[36] = _RATE_CODE
+    block[64:512] = b' ' * 448                              # (empty metadata)
+    return bytes(block)
+
+
+def _sector(sequence, seconds, timestamp_offset, num_axes_bps, values, accel_scale, raw_dtype='<i2'):
+    """A data sector of 16-bit values (samples x channels), or packed 32-bit values (samples), with the whole-second time-stamp of the sample at timestamp_offset"""
+    block = bytearray(512)
+    block[0:2] = b'AX'
+    struct.pack_into('<H', block, 2, 508)
+    struct.pack_into('<H', block, 4, 0x8000)                # (zero fractional time)
+    struct.pack_into('<I', block, 6, 42)                    # session id
+    struct.pack_into('<I', block, 10, sequence)
+    struct.pack_into('<I', block, 14, _packed_timestamp(2021, 3, 4, 5, 6, seconds))
+    struct.pack_into('<H', block, 18, (accel_scale << 13) | 300)  # accel scale bits, and light
+    struct.pack_into('<H', block, 20, 300)                  # temperature
+    block[24] = _RATE_CODE
+    block[25] = num_axes_bps
+    struct.pack_into('<h', block, 26, timestamp_offset)
+    struct.pack_into('<H', block, 28, values.shape[0])
+    raw = values.astype(raw_dtype).tobytes()
+    block[30:30 + len(raw)] = raw
+    # Word-wise sum of the sector must be zero
+    checksum = sum(struct.unpack('<255H', bytes(block[0:510]))) & 0xffff
+    struct.pack_into('<H', block, 510, (-checksum) & 0xffff)
+    return bytes(block)
+
+
+def _write_cwa(filename, hardware_type, sensor_config, num_axes_bps, sector_values, accel_scales, trailing=b'', raw_dtype='<i2'):
+    samples_per_sector = sector_values[0].shape[0]
+    with open(filename, 'wb') as fh:
+        fh.write(_header(hardware_type, sensor_config))
+        for sequence, (values, accel_scale) in enumerate(zip(sector_values, accel_scales)):
+            # At 100 Hz from 10 seconds, time-stamped at the whole second before the first sample (a negative sample offset)
+            first_sample = 1000 + sequence * samples_per_sector
+            fh.write(_sector(sequence, first_sample // 100, -(first_sample % 100), num_axes_bps, values, accel_scale, raw_dtype))
+        fh.write(trailing)
+
+
+def _random_sectors(num_sectors, samples_per_sector, channels, seed):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(-2000, 2000, size=(samples_per_sector, channels)).astype(np.float64) for _ in range(num_sectors)]
+
+
+def testAccelSectorScaling():
+    # AX3, 3x 16-bit axes (80 samples per sector), alternating accelerometer scale, and a partial sector at the end of the file
+    sector_values = _random_sectors(5, 80, 3, 1)
+    accel_scales = [0, 1, 0, 1, 0]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'accel.cwa')
+        _write_cwa(filename, 0x17, 0x00, 0x32, sector_values, accel_scales, trailing=b'\x00' * 100)
+        with CwaData(filename, include_light=True, include_temperature=True) as cwa_data:
+            sample_values = cwa_data.get_sample_values()
+            samples = cwa_data.get_samples()
+            labels = cwa_data.labels
+
+    assert labels == ['time', 'accel_x', 'accel_y', 'accel_z', 'light', 'temperature']
+    assert sample_values.shape == (5 * 80, 6)
+
+    # Each sector scaled by its own accelerometer unit (256 << scale per g)
+    expected_accel = np.concatenate([values / (256 << scale) for values, scale in zip(sector_values, accel_scales)])
+    assert np.allclose(sample_values[:,1:4], expected_accel)
+
+    # Time starts at the first sample, and increases at the sample rate (up to the final sector's timestamp, after which there is no later one to interpolate towards)
+    assert abs(sample_values[0,0] - (_EPOCH_TIME + 10)) < 1e-3
+    assert np.allclose(np.diff(sample_values[:3 * 80,0]), 0.01, atol=1e-3)
+
+    # The same values as a DataFrame, with time as datetime64
+    assert list(samples.columns) == labels
+    assert samples['time'].dtype == np.dtype('datetime64[ns]')
+    assert np.allclose(samples[['accel_x', 'accel_y', 'accel_z']].to_numpy(), expected_accel)
+    assert np.all(samples['light'].to_numpy() == 300)
+
+
+def testGyroMagSectors():
+    # AX6 with magnetometer, 9x 16-bit axes (26 samples per sector, as gyro, accel, mag), 2000 dps gyro range
+    sector_values = _random_sectors(4, 26, 9, 2)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'mag.cwa')
+        _write_cwa(filename, 0x64, 0x13, 0x92, sector_values, [0] * 4)
+        with CwaData(filename) as cwa_data:
+            sample_values = cwa_data.get_sample_values()
+            labels = cwa_data.labels
+
+    assert labels == ['time', 'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'mag_x', 'mag_y', 'mag_z']
+    assert sample_values.shape == (4 * 26, 10)
+    values = np.concatenate(sector_values)
+    assert np.allclose(sample_values[:,1:4], values[:,3:6] / 256)
+    assert np.allclose(sample_values[:,4:7], values[:,0:3] * 2000 / 32768)
+    assert np.allclose(sample_values[:,7:10], values[:,6:9] / 16)
+
+
+def _packed_sectors(num_sectors, seed):
+    """Random DWORD-packed sectors (120 samples each), and the signed (x, y, z) values each sample encodes"""
+    rng = np.random.default_rng(seed)
+    fields = rng.integers(0, 1024, size=(num_sectors, 120, 3))
+    exponents = rng.integers(0, 4, size=(num_sectors, 120))
+    # Include the extremes of the 10-bit range at the largest exponent
+    fields[0, 0:4] = [[0x1ff, 0x200, 0x000], [0x3ff, 0x001, 0x200], [0x200, 0x200, 0x200], [0x1ff, 0x1ff, 0x1ff]]
+    exponents[0, 0:4] = 3
+    packed = (exponents.astype(np.uint32) << 30) | (fields[..., 2].astype(np.uint32) << 20) | (fields[..., 1].astype(np.uint32) << 10) | fields[..., 0].astype(np.uint32)
+    # Sign-extended 10-bit value, shifted by the exponent
+    values = np.where(fields >= 0x200, fields - 0x400, fields) << exponents[..., np.newaxis]
+    return list(packed), np.concatenate(values)
+
+
+def _write_packed_cwa(filename, num_sectors, seed):
+    # AX3, 3x 10-bit axes packed with a 2-bit exponent in to each 32-bit value (120 samples per sector)
+    sector_values, values = _packed_sectors(num_sectors, seed)
+    _write_cwa(filename, 0x17, 0x00, 0x30, sector_values, [0] * num_sectors, raw_dtype='<u4')
+    return values
+
+
+def testPackedSectors():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'packed.cwa')
+        values = _write_packed_cwa(filename, 4, 3)
+        with CwaData(filename) as cwa_data:
+            sample_values = cwa_data.get_sample_values()
+            labels = cwa_data.labels
+
+    assert labels == ['time', 'accel_x', 'accel_y', 'accel_z']
+    assert sample_values.shape == (4 * 120, 4)
+    # Scaled as the 16-bit values are (1/256 g)
+    assert np.array_equal(sample_values[:,1:4], values / 256)
+    assert np.array_equal(sample_values[0:4,1:4], np.array([[511, -512, 0], [-1, 1, -512], [-512, -512, -512], [511, 511, 511]]) * 8 / 256)
+
+
+def testAccelRaw():
+    sector_values = _random_sectors(5, 80, 3, 5)
+    accel_scales = [0, 1, 0, 1, 0]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'accel.cwa')
+        _write_cwa(filename, 0x17, 0x00, 0x32, sector_values, accel_scales)
+        with CwaData(filename, accel_dtype='int16') as cwa_data:
+            sample_values = cwa_data.get_sample_values()
+            labels = cwa_data.labels
+            accel_raw = cwa_data.get_accel_raw()
+            accel_g = cwa_data.get_accel_g()
+        packed_values = _write_packed_cwa(os.path.join(temp_dir, 'packed.cwa'), 3, 6)
+        with CwaData(os.path.join(temp_dir, 'packed.cwa'), accel_dtype='int16') as cwa_data:
+            packed_raw = cwa_data.get_accel_raw()
+
+    # The accelerometer is kept apart from the sample values, as its raw values, and converted to the same 'g' as the default on request
+    assert labels == ['time']
+    assert sample_values.shape == (5 * 80, 1)
+    assert accel_raw.dtype == np.int16
+    assert np.array_equal(accel_raw, np.concatenate(sector_values))
+    assert accel_g.dtype == np.float32
+    assert np.allclose(accel_g, np.concatenate([values / (256 << scale) for values, scale in zip(sector_values, accel_scales)]))
+    assert np.array_equal(packed_raw, packed_values)
+
+
+def testNoMmap():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'mag.cwa')
+        _write_cwa(filename, 0x64, 0x13, 0x92, _random_sectors(4, 26, 9, 7), [0] * 4)
+        results = []
+        for use_mmap in (True, False):
+            with CwaData(filename, include_light=True, include_temperature=True, use_mmap=use_mmap) as cwa_data:
+                sample_values = cwa_data.get_sample_values()
+                results.append((cwa_data.labels, sample_values))
+
+    assert results[1][0] == results[0][0]
+    assert np.array_equal(results[1][1], results[0][1])
+
+
+def testThreadedBlocks(monkeypatch):
+    # Each format decoded in one block on one thread, and in blocks of a few sectors across several threads
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filenames = [os.path.join(temp_dir, 'accel.cwa'), os.path.join(temp_dir, 'packed.cwa'), os.path.join(temp_dir, 'mag.cwa')]
+        _write_cwa(filenames[0], 0x17, 0x00, 0x32, _random_sectors(9, 80, 3, 8), [0, 1, 2] * 3)
+        _write_packed_cwa(filenames[1], 9, 9)
+        _write_cwa(filenames[2], 0x64, 0x13, 0x92, _random_sectors(9, 26, 9, 10), [0] * 9)
+        for filename in filenames:
+            results = []
+            for block_sectors, workers in ((4096, 1), (2, 3)):
+                monkeypatch.setattr(cwa_load, '_UNPACK_BLOCK_SECTORS', block_sectors)
+                monkeypatch.setattr(cwa_load, '_SCALE_WORKERS', workers)
+                with CwaData(filename) as cwa_data:
+                    sample_values = cwa_data.get_sample_values()
+                with CwaData(filename, accel_dtype='int16') as cwa_data:
+                    accel_raw = cwa_data.get_accel_raw()
+                results.append((sample_values, accel_raw))
+            assert np.array_equal(results[1][0], results[0][0])
+            assert np.array_equal(results[1][1], results[0][1])
+
+
+def main():
+    testAccelSectorScaling()
+    testGyroMagSectors()
+    testPackedSectors()
+    testAccelRaw()
+    testNoMmap()
+    print('Done')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Tests of splitting timestamped sample data into epochs.
+"""
+
+# --- HACK: Allow the test to run standalone as specified by a file in the repo (rather than only through the module)
+if __name__ == '__main__' and __package__ is None:
+    import sys; import os; sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))), '..')))
+# ---
+
+import numpy as np
+
+from openmovement.process.epoch import split_into_epochs
+
+
+# 20 samples at 10 Hz, half-way between each tenth of a second (0.05, 0.15, ... 1.95 seconds), so that no sample falls on an epoch boundary
+def _float_timestamps():
+    return np.arange(20) * 0.1 + 0.05
+
+def _datetime64_timestamps():
+    return (np.arange(20) * 100_000_000 + 50_000_000).astype('datetime64[ns]')
+
+
+def testFloatTimestampsFloatOffset():
+    timestamps = _float_timestamps()
+    sample_values = np.column_stack((timestamps, np.arange(20)))
+    # Epochs of 0.5 seconds from 0.3 seconds: boundaries at 0.3, 0.8, 1.3, 1.8
+    epochs, epoch_indices = split_into_epochs(sample_values, 0.5, relative_to_time=0.3, return_indices=True)
+    assert epoch_indices.tolist() == [0, 3, 8, 13, 18]
+    assert [len(epoch) for epoch in epochs] == [3, 5, 5, 5, 2]
+
+
+def testDatetime64TimestampsNumericOffset():
+    timestamps = _datetime64_timestamps()
+    sample_values = np.arange(20).reshape(-1, 1)
+    # The numeric offset is in seconds since the epoch, as for float timestamps
+    _, epoch_indices = split_into_epochs(sample_values, 0.5, timestamps=timestamps, relative_to_time=0.3, return_indices=True)
+    assert epoch_indices.tolist() == [0, 3, 8, 13, 18]
+
+
+def testDatetime64TimestampsTimedeltaInterval():
+    timestamps = _datetime64_timestamps()
+    sample_values = np.arange(20).reshape(-1, 1)
+    # Epochs start from the first sample: boundaries at 0.55, 1.05, 1.55
+    _, epoch_indices = split_into_epochs(sample_values, np.timedelta64(500, 'ms'), timestamps=timestamps, return_indices=True)
+    assert epoch_indices.tolist() == [0, 5, 10, 15]
+    # The same interval given in (fractional) seconds
+    _, epoch_indices = split_into_epochs(sample_values, 0.5, timestamps=timestamps, return_indices=True)
+    assert epoch_indices.tolist() == [0, 5, 10, 15]
+
+
+def testFloatTimestampsFractionalInterval():
+    # 100 Hz samples, many of which fall (to within rounding) on the boundaries of 0.1 second epochs
+    timestamps = 1_600_000_000 + np.arange(10000) / 100
+    sample_values = timestamps.reshape(-1, 1)
+    _, epoch_indices = split_into_epochs(sample_values, 0.1, relative_to_time=0, return_indices=True)
+    # Epochs are numbered by floor-division of the time since the offset
+    expected_indices = np.flatnonzero(np.diff(timestamps // 0.1)) + 1
+    assert epoch_indices.tolist() == [0] + expected_indices.tolist()
+
+
+def main():
+    testFloatTimestampsFloatOffset()
+    testDatetime64TimestampsNumericOffset()
+    testDatetime64TimestampsTimedeltaInterval()
+    testFloatTimestampsFractionalInterval()
+    print('Done')
+
+if __name__ == '__main__':
+    main()